@@ -1,9 +1,11 @@
 import os
+import time
 from typing import Optional
 
-import requests
 import streamlit as st
 
+from ui_client import BackendClient
+
 
 BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:5000")
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "1234")
@@ -13,6 +15,9 @@ ADMIN_USERNAME = "admin"
 USER_USERNAME = "user"
 # Easy default password for user mode (override with env var)
 USER_PASSWORD = os.environ.get("USER_PASSWORD", "1234")
+# Summarizer tier for the automatic summary on selection; unset uses the server's SUMMARY_TIER,
+# so the UI does not load a second summarization model
+AUTO_SUMMARY_TIER = os.environ.get("AUTO_SUMMARY_TIER") or None
 
 
 def _init_session():
@@ -24,65 +29,56 @@ def _init_session():
         st.session_state["view_mode"] = "user"  # UI mode; admin can switch
 
 
-def fetch_books(query: Optional[str] = None):
-    params = {"q": query} if query else {}
-    r = requests.get(f"{BACKEND_URL}/api/books/", params=params, timeout=60)
-    r.raise_for_status()
-    return r.json()
+@st.cache_resource
+def get_client() -> BackendClient:
+    # One pooled, caching client shared by every session and rerun
+    return BackendClient(BACKEND_URL)
+
+
+def fetch_books(query: Optional[str] = None, cursor: Optional[str] = None):
+    return get_client().fetch_books(query, cursor)
 
 
 def create_book(payload: dict):
-    r = requests.post(f"{BACKEND_URL}/api/books/", json=payload, timeout=60)
-    r.raise_for_status()
-    return r.json()
+    return get_client().create_book(payload)
 
 
 def get_book(book_id: int):
-    r = requests.get(f"{BACKEND_URL}/api/books/{book_id}", timeout=60)
-    r.raise_for_status()
-    return r.json()
+    return get_client().get_book(book_id)
 
 
 def update_book(book_id: int, payload: dict):
-    r = requests.put(f"{BACKEND_URL}/api/books/{book_id}", json=payload, timeout=60)
-    r.raise_for_status()
-    return r.json()
+    return get_client().update_book(book_id, payload)
 
 
 def delete_book(book_id: int):
-    r = requests.delete(f"{BACKEND_URL}/api/books/{book_id}", timeout=60)
-    r.raise_for_status()
-    return r.json()
-
-
-def summarize_book(book_id: int, max_length: int = 130, min_length: int = 30):
-    r = requests.post(
-        f"{BACKEND_URL}/api/books/{book_id}/summarize",
-        json={"max_length": max_length, "min_length": min_length},
-        timeout=600,
-    )
-    r.raise_for_status()
-    return r.json()
+    return get_client().delete_book(book_id)
+
+
+def summarize_book(book_id: int, max_length: int = 130, min_length: int = 30, wait_seconds: float = 600, tier: Optional[str] = None):
+    # Summaries run as background jobs on the backend; submit then poll for the result
+    client = get_client()
+    payload = {"max_length": max_length, "min_length": min_length}
+    if tier:
+        payload["tier"] = tier
+    job = client.submit_summary(book_id, payload)
+    deadline = time.monotonic() + wait_seconds
+    while job["status"] not in ("done", "failed"):
+        if time.monotonic() > deadline:
+            raise TimeoutError("Summary is still being generated; try again shortly")
+        time.sleep(1)
+        job = client.summary_job(job["job_id"])
+    if job["status"] == "failed":
+        raise RuntimeError(job.get("error") or "Summarization failed")
+    return job["result"]
 
 
 def recommend_books(book_id: int, top_k: int = 5):
-    r = requests.get(
-        f"{BACKEND_URL}/api/books/{book_id}/recommendations",
-        params={"top_k": top_k},
-        timeout=120,
-    )
-    r.raise_for_status()
-    return r.json()
+    return get_client().recommend_books(book_id, top_k)
 
 
-def search_by_description(description: str, top_k: int = 5):
-    r = requests.post(
-        f"{BACKEND_URL}/api/books/search-by-description",
-        json={"description": description, "top_k": top_k},
-        timeout=120,
-    )
-    r.raise_for_status()
-    return r.json()
+def search_by_description(description: str, top_k: int = 5, **filters):
+    return get_client().search_by_description(description, top_k, **filters)
 
 
 def main():
@@ -135,6 +131,7 @@ def main():
         query = st.text_input("Search books (text search)")
         st.write("Backend:", BACKEND_URL)
         if st.button("Refresh List"):
+            get_client().invalidate()
             st.session_state["refresh_counter"] = st.session_state.get("refresh_counter", 0) + 1
 
         st.divider()
@@ -144,11 +141,18 @@ def main():
         else:
             st.write("Describe what you're looking for:")
             user_description = st.text_area("Description", placeholder="e.g., A story about time travel and adventure...", key="ai_search_desc")
+            filter_cols = st.columns(2)
+            genre_filter = filter_cols[0].text_input("Genre (optional)", key="ai_search_genre")
+            author_filter = filter_cols[1].text_input("Author (optional)", key="ai_search_author")
             if st.button("Find Relevant Books", key="ai_search_btn"):
                 if user_description.strip():
                     with st.spinner("Finding relevant books using AI..."):
                         try:
-                            result = search_by_description(user_description.strip())
+                            result = search_by_description(
+                                user_description.strip(),
+                                genre=genre_filter.strip() or None,
+                                author=author_filter.strip() or None,
+                            )
                             st.session_state["ai_search_results"] = result.get("results", [])
                             st.session_state["ai_search_query"] = user_description.strip()
                             st.success(f"Found {len(result.get('results', []))} relevant book(s)")
@@ -216,12 +220,27 @@ def main():
                         st.rerun()
         st.divider()
 
-    # Fetch regular books
+    # Fetch the list, the selected book and its recommendations in parallel; the
+    # per-item calls below are then answered from the client cache
+    likely_selected = st.session_state.get("selected_book_id") or st.session_state.get("book_select")
+    # One page per view: the cursors paged through to reach it, reset when the search changes
+    if st.session_state.get("list_query") != query:
+        st.session_state["list_query"] = query
+        st.session_state["list_cursors"] = []
+    cursors = st.session_state["list_cursors"]
     try:
-        books = fetch_books(query=query)
+        page = get_client().fetch_page(
+            query, likely_selected, include_recommendations=is_authenticated, cursor=cursors[-1] if cursors else None,
+        )
     except Exception as e:
         st.error(f"Failed to fetch books: {e}")
         return
+    books = page["books"]
+
+    try:
+        availability = get_client().availability([b['id'] for b in books])
+    except Exception:
+        availability = {}
 
     cols = st.columns([2, 3])
     with cols[0]:
@@ -231,10 +250,23 @@ def main():
         for b in books:
             with st.expander(f"{b['title']} - {b['author']} ({b.get('genre') or 'Unknown'})"):
                 st.caption(b.get('created_at', ''))
+                status = availability.get(b['id'])
+                if status is not None:
+                    if status["available"]:
+                        st.caption("Available")
+                    else:
+                        st.caption(f"On loan until {status['due'][:10]}" if status.get("due") else "On loan")
                 st.write(b.get('description') or "No description.")
                 if st.button("View Details", key=f"select-{b['id']}"):
                     st.session_state["selected_book_id"] = b['id']
                     st.rerun()
+        prev_col, next_col = st.columns(2)
+        if cursors and prev_col.button("Previous page"):
+            cursors.pop()
+            st.rerun()
+        if page.get("next_cursor") and next_col.button("Next page"):
+            cursors.append(page["next_cursor"])
+            st.rerun()
 
     with cols[1]:
         st.subheader("Book Details & Summary")
@@ -253,10 +285,10 @@ def main():
                 selected_id = None
         
         if not selected_id and books:
-            selected_id = st.selectbox("Choose book", options=book_ids, format_func=lambda x: f"{book_map[x]['title']} — {book_map[x]['author']}") if books else None
+            selected_id = st.selectbox("Choose book", options=book_ids, format_func=lambda x: f"{book_map[x]['title']} — {book_map[x]['author']}", key="book_select") if books else None
         
         if selected_id:
-            # Always fetch fresh details so we have updated description/content
+            # Revalidated via ETag, so this is usually served from the client cache
             try:
                 b = get_book(selected_id)
             except Exception as err:
@@ -321,7 +353,7 @@ def main():
             ):
                 with st.spinner("Generating summary with AI..."):
                     try:
-                        res = summarize_book(selected_id)
+                        res = summarize_book(selected_id, tier=AUTO_SUMMARY_TIER)
                         st.session_state[auto_summary_key] = res.get('summary')
                     except Exception as e:
                         st.session_state[auto_summary_key] = None
@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, has_request_context, jsonify, request
+
+from backend.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+
+class AdmissionRejected(Exception):
+    """A request shed before running: 429 when the wait queue is full, 503 when its deadline passed."""
+
+    def __init__(self, status: int, message: str, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class Limiter:
+    """At most ``max_concurrent`` holders, with up to ``max_queue`` callers waiting for a slot.
+
+    Callers beyond the queue are refused at once; queued callers give up at
+    their deadline, so stale requests never start work.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        # Moving average of how long a holder keeps its slot; drives Retry-After
+        self._service_seconds = 1.0
+
+    def retry_after(self) -> int:
+        backlog = (self.waiting + 1) / max(1, self.max_concurrent)
+        return max(1, math.ceil(self._service_seconds * backlog))
+
+    def _reject(self, status: int, reason: str, message: str) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(endpoint=self.name, reason=reason)
+        return AdmissionRejected(status, message, self.retry_after())
+
+    def acquire(self, deadline: float) -> None:
+        started = time.monotonic()
+        with self._cond:
+            if self.active >= self.max_concurrent or self.waiting:
+                if self.waiting >= self.max_queue:
+                    raise self._reject(429, 'queue_full', f"Too many concurrent {self.name} requests")
+                self.waiting += 1
+                ADMISSION_QUEUED.set(self.waiting, endpoint=self.name)
+                try:
+                    while self.active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._reject(503, 'deadline', f"Timed out waiting to run {self.name}")
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                    ADMISSION_QUEUED.set(self.waiting, endpoint=self.name)
+            self.active += 1
+            ADMISSION_IN_FLIGHT.set(self.active, endpoint=self.name)
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, endpoint=self.name)
+
+    def release(self, held_seconds: float) -> None:
+        with self._cond:
+            self.active -= 1
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * held_seconds
+            ADMISSION_IN_FLIGHT.set(self.active, endpoint=self.name)
+            self._cond.notify()
+
+
+class AdmissionControl:
+    """Per-endpoint concurrency limits for the model-backed routes.
+
+    ``ADMISSION_LIMITS`` maps a name to (max concurrent, max queued); a
+    concurrency of 0 leaves that endpoint unlimited. Queued requests wait at
+    most ``ADMISSION_QUEUE_TIMEOUT`` seconds, or less when the client sends
+    ``X-Request-Timeout``; background jobs, which have no request, wait the
+    full timeout. Rejections are JSON errors with ``Retry-After``.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self._limiters: Dict[str, Limiter] = {}
+        self._queue_timeout = 10.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        limits: Dict[str, Tuple[int, int]] = app.config.get('ADMISSION_LIMITS', {})
+        self._limiters = {
+            name: Limiter(name, concurrency, queue)
+            for name, (concurrency, queue) in limits.items() if concurrency > 0
+        }
+        self._queue_timeout = float(app.config.get('ADMISSION_QUEUE_TIMEOUT', 10))
+        app.extensions['admission'] = self
+
+        @app.errorhandler(AdmissionRejected)
+        def _rejected(exc: AdmissionRejected):
+            response = jsonify({"error": exc.message})
+            response.status_code = exc.status
+            response.headers['Retry-After'] = str(exc.retry_after)
+            return response
+
+    def _deadline(self) -> float:
+        timeout = self._queue_timeout
+        if has_request_context():
+            try:
+                timeout = min(timeout, float(request.headers.get('X-Request-Timeout', timeout)))
+            except ValueError:
+                pass
+        return time.monotonic() + timeout
+
+    @contextmanager
+    def admit(self, name: str):
+        """Hold a slot of limiter ``name`` for the duration of the block."""
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            yield
+            return
+        limiter.acquire(self._deadline())
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter.release(time.monotonic() - started)
+
+
+admission = AdmissionControl()
@@ -0,0 +1,375 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from backend.catalog_version import bump_catalog_version, catalog_stamp
+from backend.models import db, Book, BookEmbedding
+from backend.ai_engine.recommender import (
+    book_text,
+    embed_texts,
+    embedding_model_label,
+    text_hash,
+)
+from backend.ai_engine.vector_file import DebouncedRewrite, MappedVectorIndex, read_version, write_vector_file
+from backend.ai_engine.vector_index import VectorIndex
+
+
+_index: Optional[Union[VectorIndex, MappedVectorIndex]] = None
+_index_lock = threading.Lock()
+# With VECTOR_FILE set: rewrites the shared file after this process's writes, whether or not
+# it has opened the index, and re-exports a file left behind the catalog by another process
+_file_rewrite: Optional[DebouncedRewrite] = None
+_stale_file_rewrite: Optional[DebouncedRewrite] = None
+_rewrite_lock = threading.Lock()
+# Encodes books written without an embedding, off the request path; the start of its last
+# completed scan bounds the next one to books written since
+_backfill: Optional[DebouncedRewrite] = None
+_backfilled_at: Optional[datetime] = None
+# Catalog version the index last caught up with, when that catch-up started, and the
+# stamps (updated_at) of the embedding rows it read
+_synced_version: Optional[int] = None
+_synced_at: Optional[datetime] = None
+_recent: Dict[int, datetime] = {}
+
+# A catch-up re-reads rows stamped this long before the previous one started: a row is stamped
+# when its write runs and becomes visible at commit, which may come after the previous read
+_CATCH_UP_OVERLAP = timedelta(minutes=2)
+# Ids per IN (...) query when loading changed vectors
+_LOAD_CHUNK = 500
+
+
+def vector_to_blob(vec: np.ndarray) -> bytes:
+    return np.asarray(vec, dtype=np.float32).tobytes()
+
+
+def blob_to_vector(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def _is_fresh(book: Book, digest: str) -> bool:
+    emb = book.embedding
+    return emb is not None and emb.text_hash == digest and emb.model_name == embedding_model_label()
+
+
+def refresh_book_embeddings(books: Iterable[Book], encode: bool = True) -> int:
+    """Encode every book whose stored embedding is missing or stale, in one batch.
+
+    Books without any text lose their embedding. With ``encode=False`` stale
+    embeddings are dropped instead, leaving the books for
+    ``backfill_missing_embeddings`` to encode later. Changes are added to the
+    session; the caller commits. Returns the number of books re-encoded.
+    """
+    pending: List[Tuple[Book, str, str]] = []
+    for book in books:
+        text = book_text(book.description, book.content)
+        if not text:
+            book.embedding = None
+            continue
+        digest = text_hash(text)
+        if not _is_fresh(book, digest):
+            pending.append((book, text, digest))
+    if not pending:
+        return 0
+    if not encode:
+        for book, _, _ in pending:
+            book.embedding = None
+        return 0
+
+    vectors = embed_texts([text for _, text, _ in pending])
+    for (book, _, digest), vec in zip(pending, vectors):
+        emb = book.embedding or BookEmbedding()
+        emb.text_hash = digest
+        emb.model_name = embedding_model_label()
+        emb.dim = int(vec.shape[0])
+        emb.vector = vector_to_blob(vec)
+        book.embedding = emb
+    return len(pending)
+
+
+def refresh_book_embedding(book: Book, encode: bool = True) -> bool:
+    """Re-encode a single book if its description/content changed."""
+    return refresh_book_embeddings([book], encode=encode) > 0
+
+
+def get_book_vector(book: Book) -> Optional[np.ndarray]:
+    """Stored vector for a book, computing (and persisting) it if missing.
+
+    Writes keep stored embeddings current, so an existing row is trusted
+    without re-reading and hashing the book's content.
+    """
+    emb = book.embedding
+    if emb is not None and emb.model_name == embedding_model_label():
+        return blob_to_vector(emb.vector)
+    if refresh_book_embedding(book):
+        db.session.commit()
+    if book.embedding is None:
+        return None
+    return blob_to_vector(book.embedding.vector)
+
+
+def backfill_missing_embeddings(updated_since: Optional[datetime] = None) -> int:
+    """Encode books that have text but no embedding from the configured model (e.g. rows seeded directly).
+
+    With ``updated_since`` only books written since then are checked, through
+    the ``updated_at`` index instead of a scan of the whole catalog. Books are
+    loaded, encoded and committed ``_LOAD_CHUNK`` at a time.
+    """
+    query = (
+        db.session.query(Book.id)
+        .outerjoin(BookEmbedding)
+        .filter(db.or_(BookEmbedding.book_id.is_(None), BookEmbedding.model_name != embedding_model_label()))
+    )
+    if updated_since is not None:
+        query = query.filter(Book.updated_at >= updated_since)
+    missing_ids = [row.id for row in query.filter(db.or_(
+        db.func.coalesce(Book.description, '') != '',
+        db.func.coalesce(Book.content, '') != '',
+    )).order_by(Book.id)]
+    count = 0
+    for start in range(0, len(missing_ids), _LOAD_CHUNK):
+        books = (
+            Book.query.options(db.undefer(Book.content))
+            .filter(Book.id.in_(missing_ids[start:start + _LOAD_CHUNK]))
+            .all()
+        )
+        encoded = refresh_book_embeddings(books)
+        if encoded:
+            vectors = [(book.id, blob_to_vector(book.embedding.vector)) for book in books if book.embedding is not None]
+            # Other workers catch up with the new vectors, and cached search results expire
+            bump_catalog_version()
+            db.session.commit()
+            index_vectors(vectors)
+            count += encoded
+        db.session.expunge_all()
+    return count
+
+
+def _backfill_recent() -> None:
+    """Background job: encode books written without an embedding since the previous run."""
+    global _backfilled_at
+    started = datetime.utcnow()
+    since = None if _backfilled_at is None else _backfilled_at - _CATCH_UP_OVERLAP
+    try:
+        backfill_missing_embeddings(since)
+    except IntegrityError:
+        # Another worker stored embeddings for the same books first; the next catch-up retries
+        db.session.rollback()
+        return
+    _backfilled_at = started
+
+
+def _schedule_backfill() -> None:
+    global _backfill
+    with _rewrite_lock:
+        if _backfill is None:
+            app = current_app._get_current_object()
+
+            def run():
+                with app.app_context():
+                    _backfill_recent()
+
+            _backfill = DebouncedRewrite(run, 0, 'Embedding backfill')
+    _backfill.schedule()
+
+
+def load_book_vectors(book_ids: Optional[Sequence[int]] = None) -> Tuple[List[int], np.ndarray]:
+    """Return (book ids, stacked embedding matrix) for the given books, or the whole catalog."""
+    query = db.session.query(BookEmbedding.book_id, BookEmbedding.vector).filter(
+        BookEmbedding.model_name == embedding_model_label()
+    )
+    if book_ids is None:
+        rows = query.all()
+    else:
+        rows = []
+        for start in range(0, len(book_ids), _LOAD_CHUNK):
+            rows.extend(query.filter(BookEmbedding.book_id.in_(book_ids[start:start + _LOAD_CHUNK])))
+    if not rows:
+        return [], np.empty((0, 0), dtype=np.float32)
+    ids = [row.book_id for row in rows]
+    matrix = np.vstack([blob_to_vector(row.vector) for row in rows])
+    return ids, matrix
+
+
+def export_vector_file(path: str, dtype: str = 'float16', chunk_size: int = 4096) -> bool:
+    """Stream the stored embeddings into a shared vector file and swap it in.
+
+    The catalog version is read before the vectors, so the file holds at
+    least that version's state.
+    """
+    version, _ = catalog_stamp()
+    query = (
+        db.session.query(BookEmbedding.book_id, BookEmbedding.vector)
+        .filter(BookEmbedding.model_name == embedding_model_label())
+        .order_by(BookEmbedding.book_id)
+        .yield_per(chunk_size)
+    )
+
+    def chunks() -> Iterator[Tuple[List[int], np.ndarray]]:
+        ids, vectors = [], []
+        for row in query:
+            ids.append(row.book_id)
+            vectors.append(blob_to_vector(row.vector))
+            if len(ids) >= chunk_size:
+                yield ids, np.vstack(vectors)
+                ids, vectors = [], []
+        if ids:
+            yield ids, np.vstack(vectors)
+
+    return write_vector_file(path, chunks(), version, dtype)
+
+
+def _file_is_stale(path: str) -> bool:
+    """Whether the vector file is missing or was built before the current catalog version."""
+    version = read_version(path)
+    return version is None or version < catalog_stamp()[0]
+
+
+def _file_rewrites() -> Tuple[DebouncedRewrite, DebouncedRewrite]:
+    """This process's (after-write, stale-file) rewrites of ``VECTOR_FILE``, created on first use."""
+    global _file_rewrite, _stale_file_rewrite
+    with _rewrite_lock:
+        if _file_rewrite is None:
+            app = current_app._get_current_object()
+            path, dtype = app.config['VECTOR_FILE'], app.config['VECTOR_FILE_DTYPE']
+            delay = app.config['VECTOR_FILE_REWRITE_DELAY']
+
+            def rewrite():
+                with app.app_context():
+                    export_vector_file(path, dtype)
+
+            def rewrite_if_stale():
+                with app.app_context():
+                    if _file_is_stale(path):
+                        export_vector_file(path, dtype)
+
+            _file_rewrite = DebouncedRewrite(rewrite, delay)
+            # Later than a writing worker's own rewrite, which normally makes this a no-op
+            _stale_file_rewrite = DebouncedRewrite(
+                rewrite_if_stale, 2 * delay + app.config['VECTOR_FILE_CHECK_INTERVAL'],
+            )
+    return _file_rewrite, _stale_file_rewrite
+
+
+def _open_vector_file(path: str) -> MappedVectorIndex:
+    app = current_app._get_current_object()
+    if _file_is_stale(path):
+        export_vector_file(path, app.config['VECTOR_FILE_DTYPE'])
+    return MappedVectorIndex(path, lambda: catalog_stamp()[0], app.config['VECTOR_FILE_CHECK_INTERVAL'])
+
+
+def _upsert_vectors(index: VectorIndex, book_ids: Sequence[int]) -> None:
+    ids, matrix = load_book_vectors(book_ids)
+    for book_id, vec in zip(ids, matrix):
+        index.upsert(book_id, vec)
+
+
+def _catch_up(index: Union[VectorIndex, MappedVectorIndex]) -> None:
+    """Bring the resident index up to date with embedding rows written by any process.
+
+    Runs when the catalog version moved since the last call, and schedules
+    the background backfill of books written without an embedding; its
+    commits move the version again, so their vectors arrive in a later
+    catch-up. For the resident index, embedding rows
+    stamped since then are read through the ``updated_at`` index and only
+    those with a new stamp are loaded; the stored ids are compared with the
+    index's only when the row count says a book was removed or missed. The
+    caller holds ``_index_lock``.
+    """
+    global _synced_version, _synced_at, _recent
+    version, _ = catalog_stamp()
+    if version == _synced_version:
+        return
+    started = datetime.utcnow()
+    since = None if _synced_at is None else _synced_at - _CATCH_UP_OVERLAP
+    # Books written without an embedding (STARTUP_PROFILE=catalog, bulk imports with ?embed=0)
+    # are encoded in the background, after the first search or recommendation that follows
+    _schedule_backfill()
+    if isinstance(index, MappedVectorIndex):
+        # Other workers' vectors arrive through the shared file. A writer that exits before its
+        # rewrite runs leaves the file behind the catalog; then this process re-exports it
+        if (read_version(index.path) or 0) < version:
+            _file_rewrites()[1].schedule()
+        _synced_version, _synced_at = version, started
+        return
+    label = embedding_model_label()
+    current = BookEmbedding.model_name == label
+    rows = (
+        db.session.query(BookEmbedding.book_id, BookEmbedding.updated_at)
+        .filter(current, BookEmbedding.updated_at >= (since or started - _CATCH_UP_OVERLAP))
+        .all()
+    )
+    if _synced_at is None:
+        # Stamps first: a row rewritten during the full read is simply loaded again next time
+        index.load(*load_book_vectors())
+    else:
+        _upsert_vectors(index, [row.book_id for row in rows if _recent.get(row.book_id) != row.updated_at])
+    _recent = {row.book_id: row.updated_at for row in rows}
+    _synced_at = started
+    if db.session.scalar(db.select(db.func.count()).select_from(BookEmbedding).where(current)) != len(index):
+        # Core execution: no ORM row processing for one id per book
+        stored_ids = set(db.session.connection().execute(db.select(BookEmbedding.book_id).where(current)).scalars())
+        indexed_ids = set(index.ids())
+        for book_id in indexed_ids - stored_ids:
+            index.remove(book_id)
+        _upsert_vectors(index, sorted(stored_ids - indexed_ids))
+    _synced_version = version
+
+
+def get_vector_index() -> Union[VectorIndex, MappedVectorIndex]:
+    """Process-wide vector index, built from the embedding store on first use.
+
+    Whenever the catalog version has moved, the resident index catches up
+    with other workers' writes and books without an embedding are queued
+    for encoding in the background. With ``VECTOR_FILE`` set it maps the
+    shared vector file instead (writing it first if missing or behind the
+    catalog), so worker processes share one copy of the vectors.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = current_app.config.get('VECTOR_FILE')
+                if path:
+                    _index = _open_vector_file(path)
+                else:
+                    index = VectorIndex()
+                    _catch_up(index)
+                    _index = index
+    if catalog_stamp()[0] != _synced_version:
+        with _index_lock:
+            _catch_up(_index)
+    return _index
+
+
+def _schedule_file_rewrite() -> None:
+    # Also without a loaded index: other workers only see this process's writes through the file
+    if current_app.config.get('VECTOR_FILE'):
+        _file_rewrites()[0].schedule()
+
+
+def index_book(book: Book) -> None:
+    """Mirror a committed book's embedding into the resident index, if it is loaded, and the vector file."""
+    if _index is not None:
+        if book.embedding is None:
+            _index.remove(book.id)
+        else:
+            _index.upsert(book.id, blob_to_vector(book.embedding.vector))
+    _schedule_file_rewrite()
+
+
+def unindex_book(book_id: int) -> None:
+    if _index is not None:
+        _index.remove(book_id)
+    _schedule_file_rewrite()
+
+
+def index_vectors(items: Iterable[Tuple[int, np.ndarray]]) -> None:
+    """Upsert already-committed (book_id, vector) pairs into the resident index, if loaded, and the vector file."""
+    if _index is not None:
+        for book_id, vec in items:
+            _index.upsert(book_id, vec)
+    _schedule_file_rewrite()
@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class ModelLoader:
+    """Thread-safe, load-once cache around a model factory that records its load state.
+
+    Concurrent first calls wait for a single load instead of each loading
+    their own copy. Results are cached per positional arguments.
+    """
+
+    def __init__(self, name: str, factory: Callable[..., Any]):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._values: Dict[Hashable, Any] = {}
+        self._fallback: Any = None
+        self.state = 'not_loaded'  # not_loaded -> loading -> ready | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.__doc__ = factory.__doc__
+        self.__wrapped__ = factory
+
+    def __call__(self, *args):
+        try:
+            return self._values[args]
+        except KeyError:
+            if self._fallback is not None:
+                return self._fallback
+        with self._lock:
+            if args in self._values:
+                return self._values[args]
+            self.state = 'loading'
+            started = time.monotonic()
+            try:
+                value = self._factory(*args)
+            except Exception as exc:
+                self.state = 'failed'
+                self.error = str(exc) or exc.__class__.__name__
+                raise
+            self._values[args] = value
+            self.load_seconds = round(time.monotonic() - started, 3)
+            self.state = 'ready'
+            self.error = None
+            logging.info("Loaded model %s in %.1fs", self.name, self.load_seconds)
+            return value
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._values)
+
+    def install(self, value: Any, *args) -> None:
+        """Use a pre-built model for ``args`` instead of calling the factory (e.g. offline stand-ins).
+
+        Installed without ``args`` it also serves every argument combination not loaded yet.
+        """
+        with self._lock:
+            self._values[args] = value
+            if not args:
+                self._fallback = value
+            self.state = 'ready'
+            self.error = None
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._fallback = None
+            self.state = 'not_loaded'
+
+    def status(self) -> Dict[str, Any]:
+        return {"state": self.state, "load_seconds": self.load_seconds, "error": self.error}
+
+
+def quantize_linear_layers(model):
+    """Dynamic int8 quantization of a torch model's Linear layers, for faster CPU inference."""
+    import torch
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def configure_torch_threads(threads: int) -> None:
+    """Cap torch's intra-op thread pool; 0 keeps torch's default of one thread per core."""
+    if threads <= 0:
+        return
+    try:
+        import torch
+    except ImportError:
+        logging.warning("torch is not installed; ignoring the thread setting")
+        return
+    torch.set_num_threads(threads)
+
+
+_loaders: Dict[str, ModelLoader] = {}
+
+
+def model_loader(name: str) -> Callable[[Callable[..., Any]], ModelLoader]:
+    """Decorator registering a model factory under ``name`` for readiness reporting."""
+    def decorator(factory: Callable[..., Any]) -> ModelLoader:
+        loader = ModelLoader(name, factory)
+        _loaders[name] = loader
+        return loader
+    return decorator
+
+
+def model_status() -> Dict[str, Dict[str, Any]]:
+    return {name: loader.status() for name, loader in _loaders.items()}
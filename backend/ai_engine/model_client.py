@@ -0,0 +1,90 @@
+"""Client side of the shared model server (see ``backend.ai_engine.model_server``).
+
+When ``MODEL_SERVER_SOCKET`` is set, ``embed_texts`` and ``summarize_text``
+forward their work here instead of loading models into the HTTP worker.
+"""
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection
+from typing import Any, Optional
+
+
+class ModelServerError(RuntimeError):
+    """The model server could not be reached or reported a failure."""
+
+
+def authkey_file(address: str) -> str:
+    """Where a server started without ``MODEL_SERVER_AUTHKEY`` keeps its generated key (mode 0600)."""
+    return f"{address}.key"
+
+
+def read_authkey(address: str) -> bytes:
+    with open(authkey_file(address), 'rb') as f:
+        return f.read().strip()
+
+
+class ModelClient:
+    """Calls the model server over its Unix socket, one connection per calling thread.
+
+    Without an ``authkey`` each new connection reads the server's generated
+    key file, so the worker must run as the same user as the server.
+    """
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None, timeout: float = 600.0):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            authkey = self.authkey or read_authkey(self.address)
+            conn = Client(self.address, family='AF_UNIX', authkey=authkey)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def call(self, op: str, *args, **kwargs) -> Any:
+        # A dropped connection (e.g. the server restarted) is retried once on a fresh one
+        for attempt in (1, 2):
+            try:
+                conn = self._connection()
+                conn.send((op, args, kwargs))
+                if not conn.poll(self.timeout):
+                    # The late reply would be read by the next call; drop the connection
+                    self._reset()
+                    raise ModelServerError(f"Model server did not answer {op!r} within {self.timeout:.0f}s")
+                status, payload = conn.recv()
+                break
+            except AuthenticationError as exc:
+                self._reset()
+                raise ModelServerError(f"Model server at {self.address} rejected the authkey") from exc
+            except (EOFError, OSError) as exc:
+                self._reset()
+                if attempt == 2:
+                    raise ModelServerError(f"Model server unreachable at {self.address}: {exc}") from exc
+        if status != 'ok':
+            raise ModelServerError(payload)
+        return payload
+
+
+_client: Optional[ModelClient] = None
+
+
+def configure_model_server(address: str, authkey: str = '', timeout: float = 600.0) -> None:
+    """Send model work to the server at ``address``; an empty address keeps models in-process."""
+    global _client
+    _client = ModelClient(address, authkey.encode('utf-8') or None, timeout) if address else None
+
+
+def remote() -> Optional[ModelClient]:
+    return _client
@@ -0,0 +1,251 @@
+"""Shared model server: one process owns the models, HTTP workers call it over a Unix socket.
+
+Usage:
+    python -m backend.ai_engine.model_server [--socket PATH] [--torch-threads N]
+
+Start the API with ``MODEL_SERVER_SOCKET`` set to the same path and its
+workers forward embedding and summarization here instead of each loading
+their own copy of the models. Connections must present
+``MODEL_SERVER_AUTHKEY``; when it is unset the server generates a key into
+``<socket>.key`` (mode 0600) that workers of the same user read.
+"""
+import argparse
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.config import config
+from backend.ai_engine.loading import configure_torch_threads, model_status
+from backend.ai_engine.model_client import authkey_file
+from backend.ai_engine.recommender import configure_embedder, embed_texts, preload_recommender
+from backend.ai_engine.summarizer import configure_summarizer, preload_summarizer, summarize_text, summarize_texts
+
+
+Request = Tuple[Any, Future]
+
+
+class ModelServer:
+    """Serves embed and summarize calls from many clients through two batching queues.
+
+    Embedding requests arriving within ``embed_window_ms`` of each other are
+    encoded in one model call (up to ``embed_max_batch`` texts). Truncate-mode
+    summaries with the same length settings and tier are batched the same way; long
+    documents run one at a time, as they already batch their chunks. Each
+    queue holds at most ``max_queue`` requests; past that a caller waits up
+    to ``queue_timeout`` seconds for room and then gets an error.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        authkey: bytes,
+        max_queue: int = 64,
+        queue_timeout: float = 30.0,
+        embed_window_ms: float = 5.0,
+        embed_max_batch: int = 64,
+        summary_window_ms: float = 20.0,
+        summary_max_batch: int = 4,
+    ):
+        if not authkey:
+            # Requests are unpickled, so an open socket would run any local user's code
+            raise ValueError("The model server requires an authkey")
+        self.address = address
+        self.authkey = authkey
+        self.queue_timeout = queue_timeout
+        self.embed_window = embed_window_ms / 1000.0
+        self.embed_max_batch = max(1, embed_max_batch)
+        self.summary_window = summary_window_ms / 1000.0
+        self.summary_max_batch = max(1, summary_max_batch)
+        self._embed_queue: "queue.Queue[Request]" = queue.Queue(max_queue)
+        self._summary_queue: "queue.Queue[Request]" = queue.Queue(max_queue)
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self.address):
+            os.remove(self.address)  # stale socket left by a previous run
+        # Created owner-only (0600) rather than chmodded after bind, leaving no window
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(umask)
+        threading.Thread(target=self._embed_worker, name="embed-worker", daemon=True).start()
+        threading.Thread(target=self._summary_worker, name="summary-worker", daemon=True).start()
+        logging.info("Model server listening on %s", self.address)
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    logging.warning("Rejected a model server connection", exc_info=True)
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "models": model_status(),
+            "queued": {"embed": self._embed_queue.qsize(), "summarize": self._summary_queue.qsize()},
+        }
+
+    # -- connections -------------------------------------------------------
+
+    def _serve_connection(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    op, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ('ok', self._dispatch(op, args, kwargs))
+                except Exception as exc:
+                    logging.warning("Model server %s request failed: %s", op, exc)
+                    reply = ('error', f"{exc.__class__.__name__}: {exc}")
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+    def _dispatch(self, op: str, args: tuple, kwargs: dict) -> Any:
+        if op == 'embed':
+            return self._submit(self._embed_queue, list(args[0]))
+        if op == 'summarize':
+            return self._submit(self._summary_queue, (args, kwargs))
+        if op == 'status':
+            return self.status()
+        raise ValueError(f"Unknown operation {op!r}")
+
+    def _submit(self, work: "queue.Queue[Request]", item: Any) -> Any:
+        future: Future = Future()
+        try:
+            work.put((item, future), timeout=self.queue_timeout)
+        except queue.Full:
+            raise RuntimeError("Model server queue is full") from None
+        return future.result()
+
+    # -- batching workers ------------------------------------------------------
+
+    @staticmethod
+    def _collect(work: "queue.Queue[Request]", window: float, max_size: int, size: Callable[[Any], int]) -> List[Request]:
+        batch = [work.get()]
+        total = size(batch[0][0])
+        deadline = time.monotonic() + window
+        while total < max_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = work.get(timeout=remaining) if remaining > 0 else work.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            total += size(request[0])
+        return batch
+
+    def _embed_worker(self) -> None:
+        while True:
+            batch = self._collect(self._embed_queue, self.embed_window, self.embed_max_batch, len)
+            try:
+                vectors = embed_texts([text for texts, _ in batch for text in texts])
+            except Exception as exc:
+                logging.exception("Batched encode of %d requests failed", len(batch))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            offset = 0
+            for texts, future in batch:
+                future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+    def _summary_worker(self) -> None:
+        while True:
+            batch = self._collect(self._summary_queue, self.summary_window, self.summary_max_batch, lambda _: 1)
+            groups: Dict[Tuple[int, int, Optional[str]], List[Request]] = {}
+            for (args, kwargs), future in batch:
+                if kwargs.get('long_document'):
+                    self._resolve([future], lambda: [summarize_text(*args, **kwargs)])
+                    continue
+                key = (kwargs.get('max_length', 130), kwargs.get('min_length', 30), kwargs.get('tier'))
+                groups.setdefault(key, []).append(((args, kwargs), future))
+            for (max_length, min_length, tier), requests in groups.items():
+                texts = [args[0] for (args, _), _ in requests]
+                self._resolve(
+                    [future for _, future in requests],
+                    lambda: summarize_texts(texts, max_length, min_length, batch_size=len(texts), tier=tier),
+                )
+
+    @staticmethod
+    def _resolve(futures: List[Future], run: Callable[[], List[Any]]) -> None:
+        try:
+            results = run()
+        except Exception as exc:
+            logging.exception("Summarization of %d requests failed", len(futures))
+            for future in futures:
+                future.set_exception(exc)
+            return
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+
+def _preload() -> None:
+    for name, preload in (("recommender", preload_recommender), ("summarizer", preload_summarizer)):
+        try:
+            preload()
+        except Exception:
+            logging.exception("Model server %s preload failed", name)
+
+
+def _generated_authkey(address: str) -> bytes:
+    """The key kept in ``authkey_file(address)``, created owner-only on first start and reused after."""
+    path = authkey_file(address)
+    if os.path.exists(path):
+        os.chmod(path, 0o600)
+        with open(path, 'rb') as f:
+            key = f.read().strip()
+        if key:
+            return key
+    key = secrets.token_hex(32).encode('ascii')
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    logging.info("Generated a model server authkey in %s", path)
+    return key
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Serve the embedding and summarization models over a Unix socket')
+    parser.add_argument('--socket', default=config.MODEL_SERVER_SOCKET, help='socket path (default: MODEL_SERVER_SOCKET)')
+    parser.add_argument('--torch-threads', type=int, default=config.MODEL_SERVER_TORCH_THREADS,
+                        help='torch intra-op threads, 0 = torch default')
+    parser.add_argument('--max-queue', type=int, default=config.MODEL_SERVER_MAX_QUEUE,
+                        help='queued requests per model before callers are refused')
+    parser.add_argument('--no-preload', action='store_true', help='load models on first request')
+    args = parser.parse_args(argv)
+    if not args.socket:
+        parser.error('no --socket given and MODEL_SERVER_SOCKET is not set')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    configure_torch_threads(args.torch_threads)
+    configure_embedder(config.EMBEDDING_MODEL, config.EMBEDDING_QUANTIZE, config.MODEL_LOCAL_FILES_ONLY)
+    configure_summarizer(config.SUMMARY_PROFILES, config.SUMMARY_TIER, config.MODEL_LOCAL_FILES_ONLY)
+    server = ModelServer(
+        args.socket,
+        authkey=config.MODEL_SERVER_AUTHKEY.encode('utf-8') or _generated_authkey(args.socket),
+        max_queue=args.max_queue,
+        embed_window_ms=config.ENCODE_BATCH_WINDOW_MS,
+        embed_max_batch=max(config.ENCODE_MAX_BATCH, 64),
+        summary_max_batch=config.SUMMARY_BATCH_SIZE,
+    )
+    if not args.no_preload:
+        threading.Thread(target=_preload, name="model-preload", daemon=True).start()
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
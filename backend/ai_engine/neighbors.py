@@ -0,0 +1,165 @@
+"""Precomputed nearest-neighbour lists behind book recommendations.
+
+Build or rebuild the table with:
+    python -m backend.ai_engine.neighbors [--neighbors 20] [--block-size 256]
+
+Afterwards writes keep it current through ``update_neighbors``.
+"""
+import argparse
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from flask import current_app
+
+from backend.models import db, Book, BookNeighbor
+from backend.ai_engine.embedding_store import get_vector_index
+from backend.ai_engine.vector_index import VectorIndex
+
+
+# Cap on scores held at once while ranking a block (block rows x catalog size, ~128 MiB)
+MAX_BLOCK_CELLS = 32 * 1024 * 1024
+# Ids per IN (...) clause, below SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+Ranking = List[Tuple[int, float]]
+
+
+def _chunks(items: Iterable[int], size: int = _IN_CHUNK) -> Iterator[List[int]]:
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def neighbor_table_built() -> bool:
+    return db.session.query(BookNeighbor.book_id).first() is not None
+
+
+def _rank_lists(index: VectorIndex, book_ids: Iterable[int], n_neighbors: int, block_size: int = 256) -> Iterator[Tuple[int, Ranking]]:
+    """Yield (book_id, neighbours) for each indexed book, ranked a block of books per matrix product."""
+    block = max(1, min(block_size, MAX_BLOCK_CELLS // max(1, len(index))))
+    ids = [book_id for book_id in book_ids if book_id in index]
+    for start in range(0, len(ids), block):
+        chunk = ids[start:start + block]
+        queries = np.vstack([index.get(book_id) for book_id in chunk])
+        yield from zip(chunk, index.search_many(queries, n_neighbors, [[book_id] for book_id in chunk]))
+
+
+def _insert_rows(rows: List[dict]) -> None:
+    if rows:
+        db.session.execute(BookNeighbor.__table__.insert(), rows)
+
+
+def build_neighbor_table(n_neighbors: Optional[int] = None, block_size: int = 256) -> int:
+    """Recompute every book's neighbour list from the stored embeddings.
+
+    Runs in one transaction, so readers see the previous table until it
+    commits. Returns the number of rows written.
+    """
+    n_neighbors = n_neighbors or current_app.config['RECOMMENDATION_NEIGHBORS']
+    index = get_vector_index()
+    db.session.execute(BookNeighbor.__table__.delete())
+    written, rows = 0, []
+    for done, (book_id, ranking) in enumerate(_rank_lists(index, index.ids(), n_neighbors, block_size), start=1):
+        rows.extend({"book_id": book_id, "neighbor_id": other, "score": score} for other, score in ranking)
+        if len(rows) >= 10000:
+            _insert_rows(rows)
+            written += len(rows)
+            rows = []
+            logging.info("Ranked neighbours for %d/%d books", done, len(index))
+    _insert_rows(rows)
+    written += len(rows)
+    db.session.commit()
+    return written
+
+
+def _merge_offers(offers: Dict[int, Ranking], n_neighbors: int) -> None:
+    """Insert (book, score) offers into the existing lists they now rank in, dropping displaced entries."""
+    for chunk in _chunks(offers):
+        lists: Dict[int, List[BookNeighbor]] = {}
+        for row in BookNeighbor.query.filter(BookNeighbor.book_id.in_(chunk)):
+            lists.setdefault(row.book_id, []).append(row)
+        for book_id, entries in lists.items():
+            candidates = [(row.score, row.neighbor_id, row) for row in entries]
+            candidates += [(score, other, None) for other, score in offers[book_id]]
+            candidates.sort(key=lambda c: (-c[0], c[1]))
+            for rank, (score, other, row) in enumerate(candidates):
+                if rank >= n_neighbors and row is not None:
+                    db.session.delete(row)
+                elif rank < n_neighbors and row is None:
+                    db.session.add(BookNeighbor(book_id=book_id, neighbor_id=other, score=score))
+
+
+def drop_neighbor_rows(book_id: int) -> List[int]:
+    """Delete a book's own list and its entries in other lists, in the caller's transaction.
+
+    Returns the books whose lists lost an entry, for ``update_neighbors`` to refill.
+    """
+    shortened = [row.book_id for row in db.session.query(BookNeighbor.book_id).filter(BookNeighbor.neighbor_id == book_id)]
+    BookNeighbor.query.filter(
+        db.or_(BookNeighbor.book_id == book_id, BookNeighbor.neighbor_id == book_id)
+    ).delete(synchronize_session=False)
+    return shortened
+
+
+def update_neighbors(book_ids: Iterable[int], refill: Iterable[int] = ()) -> None:
+    """Bring the stored lists up to date after the given books were written or deleted.
+
+    Call once the change is committed and mirrored into the vector index.
+    Changed books that still have a vector get their own list recomputed and
+    are merged into the lists of their new neighbours; every list that
+    contained a changed book is recomputed, as are the lists of ``refill``.
+    Does nothing until the table has been built.
+    """
+    changed: Set[int] = set(book_ids)
+    if not changed or not neighbor_table_built():
+        return
+    n_neighbors = current_app.config['RECOMMENDATION_NEIGHBORS']
+    index = get_vector_index()
+
+    recompute = changed | set(refill)
+    for chunk in _chunks(changed):
+        recompute.update(
+            row.book_id for row in
+            db.session.query(BookNeighbor.book_id).filter(BookNeighbor.neighbor_id.in_(chunk))
+        )
+    for chunk in _chunks(recompute):
+        BookNeighbor.query.filter(BookNeighbor.book_id.in_(chunk)).delete(synchronize_session=False)
+
+    rows, offers = [], {}
+    for book_id, ranking in _rank_lists(index, recompute, n_neighbors):
+        rows.extend({"book_id": book_id, "neighbor_id": other, "score": score} for other, score in ranking)
+        if book_id in changed:
+            for other, score in ranking:
+                if other not in recompute:
+                    offers.setdefault(other, []).append((book_id, score))
+    _insert_rows(rows)
+    _merge_offers(offers, n_neighbors)
+    db.session.commit()
+
+
+def stored_neighbors(book_id: int, top_k: int) -> List[Tuple[Book, float]]:
+    """The book's best ``top_k`` stored neighbours; empty when it has no stored list."""
+    return (
+        db.session.query(Book, BookNeighbor.score)
+        .join(BookNeighbor, BookNeighbor.neighbor_id == Book.id)
+        .filter(BookNeighbor.book_id == book_id)
+        .order_by(BookNeighbor.score.desc(), Book.id)
+        .limit(top_k)
+        .all()
+    )
+
+
+if __name__ == '__main__':
+    from backend.app import create_app
+
+    parser = argparse.ArgumentParser(description='Precompute every book\'s nearest neighbours')
+    parser.add_argument('--neighbors', type=int, help='list length (default: RECOMMENDATION_NEIGHBORS)')
+    parser.add_argument('--block-size', type=int, default=256, help='books ranked per matrix product')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    app = create_app()
+    with app.app_context():
+        rows = build_neighbor_table(args.neighbors, args.block_size)
+        print('Stored', rows, 'neighbour rows')
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from backend.metrics import SEARCH_CACHE_REQUESTS
+
+
+class TTLCache:
+    """Thread-safe LRU map whose entries also expire ``ttl`` seconds after being stored.
+
+    A ``max_size`` of 0 disables the cache. Every lookup is counted in
+    ``search_cache_requests_total{cache=<name>, result=hit|miss}``.
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(self, max_size: int, ttl: float) -> None:
+        with self._lock:
+            self.max_size, self.ttl = max_size, ttl
+            self._entries.clear()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        SEARCH_CACHE_REQUESTS.inc(cache=self.name, result='hit' if entry is not None else 'miss')
+        return entry[1] if entry is not None else None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# (embedding model label, normalized query text) -> its (read-only) embedding
+query_vectors = TTLCache('query_vectors')
+# (query key, top_k, filters, catalog version, index generation) -> ranked (book_id, score) pairs
+search_results = TTLCache('search_results')
+
+
+def configure_search_cache(vector_size: int, result_size: int, ttl: float) -> None:
+    """Size both search caches; a size of 0 turns that cache off."""
+    query_vectors.configure(vector_size, ttl)
+    search_results.configure(result_size, ttl)
+
+
+def normalize_query(text: str, fold_case: bool = False) -> str:
+    """Collapse whitespace, and case with ``fold_case``, so trivially different phrasings share a cache entry.
+
+    Only fold case for a model that lowercases its input anyway; for a cased
+    model it would change the vector.
+    """
+    return ' '.join((text.lower() if fold_case else text).split())
@@ -1,37 +1,170 @@
-from typing import List, Tuple
+import hashlib
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from functools import lru_cache
 
+from backend.ai_engine import model_client
+from backend.ai_engine.loading import model_loader, quantize_linear_layers
+from backend.ai_engine.query_cache import normalize_query, query_vectors
+from backend.metrics import timed
 
-@lru_cache(maxsize=1)
-def get_embedding_model() -> SentenceTransformer:
-    return SentenceTransformer("all-MiniLM-L6-v2")
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# (model id or local directory, int8-quantized, local files only); see configure_embedder
+_embedder = (EMBEDDING_MODEL_NAME, False, False)
+
+
+def configure_embedder(model: str, quantize: bool = False, local_files_only: bool = False) -> None:
+    global _embedder
+    _embedder = (model, quantize, local_files_only)
+
+
+def embedding_model_label() -> str:
+    """Tag stored with each book vector; vectors from another model or setting are re-encoded."""
+    model, quantize, _ = _embedder
+    return model + ('+int8' if quantize else '')
+
+
+@model_loader("embedding")
+def get_embedding_model(
+    model: str = EMBEDDING_MODEL_NAME, quantize: bool = False, local_files_only: bool = False,
+) -> "SentenceTransformer":
+    # Imported here so processes that never embed don't pay for torch at startup
+    from sentence_transformers import SentenceTransformer
+
+    encoder = SentenceTransformer(model, local_files_only=local_files_only)
+    return quantize_linear_layers(encoder) if quantize else encoder
 
 
 def preload_recommender() -> None:
     """Ensure the sentence transformer is loaded into memory."""
-    get_embedding_model()
+    get_embedding_model(*_embedder)
+
+
+def book_text(description: Optional[str], content: Optional[str]) -> str:
+    """Text a book is embedded from: description followed by content."""
+    return ((description or '') + '\n' + (content or '')).strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
 
 def embed_texts(texts: List[str]) -> np.ndarray:
-    model = get_embedding_model()
-    return np.array(model.encode(texts, normalize_embeddings=True))
+    client = model_client.remote()
+    if client is not None:
+        with timed("encode"):
+            return client.call("embed", list(texts))
+    model = get_embedding_model(*_embedder)
+    with timed("encode"):
+        return np.array(model.encode(texts, normalize_embeddings=True))
+
+
+class EncodeBatcher:
+    """Coalesces concurrent single-text encode calls into batched ``encode`` calls.
+
+    The first request to arrive opens a window of ``window_ms``; every request
+    that arrives before it closes (up to ``max_batch``) is encoded in the same
+    model call, and each caller gets back its own row.
+    """
+
+    def __init__(self, window_ms: float = 5.0, max_batch: int = 32):
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def encode(self, text: str) -> np.ndarray:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                vectors = embed_texts([text for text, _ in batch])
+            except Exception as exc:
+                logging.exception("Batched encode of %d queries failed", len(batch))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), vec in zip(batch, vectors):
+                future.set_result(vec)
+
+
+_batcher: Optional[EncodeBatcher] = None
+
+
+def configure_query_batching(window_ms: float, max_batch: int) -> None:
+    """Route ``encode_query`` through a micro-batcher; a window of 0 disables batching."""
+    global _batcher
+    _batcher = EncodeBatcher(window_ms, max_batch) if window_ms > 0 and max_batch > 1 else None
+
+
+# Embedding model label -> whether its tokenizer lowercases input
+_uncased: Dict[str, bool] = {}
+
+
+def _model_is_uncased() -> bool:
+    """Whether the in-process embedding model ignores case, read from its tokenizer once loaded.
 
+    Unknown counts as cased: before the model is loaded, and with a remote
+    model server, queries keep their case.
+    """
+    label = embedding_model_label()
+    if label not in _uncased:
+        if model_client.remote() is not None or not get_embedding_model.loaded:
+            return False
+        tokenizer = getattr(get_embedding_model(*_embedder), 'tokenizer', None)
+        _uncased[label] = bool(getattr(tokenizer, 'do_lower_case', False))
+    return _uncased[label]
 
-def cosine_similarities(query_vec: np.ndarray, matrix: np.ndarray) -> np.ndarray:
-    return np.dot(matrix, query_vec)
 
+def query_key(text: str) -> Tuple[str, str]:
+    """Cache key of a search query: the embedding model label and the normalized text."""
+    return embedding_model_label(), normalize_query(text, fold_case=_model_is_uncased())
 
-def top_k_similar(query_text: str, corpus_texts: List[str], top_k: int = 5) -> List[Tuple[int, float]]:
-    if not corpus_texts:
-        return []
-    model = get_embedding_model()
-    query_vec = model.encode([query_text], normalize_embeddings=True)[0]
-    corpus_vecs = embed_texts(corpus_texts)
-    scores = cosine_similarities(query_vec, corpus_vecs)
-    top_idx = np.argsort(-scores)[:top_k]
-    return [(int(i), float(scores[i])) for i in top_idx]
 
+def encode_query(text: str) -> np.ndarray:
+    """Embedding of a search query; repeated queries are served from ``query_vectors``."""
+    key = query_key(text)
+    vec = query_vectors.get(key)
+    if vec is not None:
+        return vec
+    text = key[1]
+    vec = _batcher.encode(text) if _batcher is not None else embed_texts([text])[0]
+    vec.setflags(write=False)  # shared by every later hit
+    query_vectors.put(key, vec)
+    return vec
 
@@ -1,41 +1,219 @@
-from functools import lru_cache
-from typing import Optional
+import re
+from typing import Dict, List, NamedTuple, Optional
 
-from transformers import pipeline
+from backend.ai_engine import model_client
+from backend.ai_engine.loading import model_loader, quantize_linear_layers
+from backend.metrics import timed
 
 
-@lru_cache(maxsize=1)
-def get_bart_summarizer():
-    # Lazy-loads and caches the summarization pipeline
-    return pipeline(
-        task="summarization",
-        model="facebook/bart-large-cnn",
-        tokenizer="facebook/bart-large-cnn",
-    )
+SUMMARIZER_MODEL_NAME = "facebook/bart-large-cnn"
+# BART reads at most 1024 positions; keep headroom for the BOS/EOS tokens
+MAX_CHUNK_TOKENS = 1000
+# Partial summaries are re-summarized until they fit one chunk; stop after this many rounds
+MAX_REDUCE_ROUNDS = 3
+# Characters of input read by truncate-mode summaries
+TRUNCATE_CHARS = 4000
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+class InferenceProfile(NamedTuple):
+    """How one latency tier runs the summarizer."""
+
+    model: str  # hub id or local directory
+    quantize: bool = False  # dynamic int8 quantization of the Linear layers
+    num_beams: int = 0  # 0 keeps the model's own generation setting
+    max_length: int = 512  # cap on the requested summary length, in tokens
+
+    @property
+    def label(self) -> str:
+        """Stored as the summary cache's ``model_name``: anything that changes the output."""
+        label = self.model + ('+int8' if self.quantize else '')
+        return f"{label}/beams={self.num_beams}" if self.num_beams else label
+
+
+_profiles: Dict[str, InferenceProfile] = {"quality": InferenceProfile(SUMMARIZER_MODEL_NAME)}
+_default_tier = "quality"
+_local_files_only = False
+
+
+def configure_summarizer(profiles: Dict[str, dict], default_tier: str, local_files_only: bool = False) -> None:
+    """Install the latency tiers from ``SUMMARY_PROFILES``; ``default_tier`` serves requests naming none."""
+    global _profiles, _default_tier, _local_files_only
+    if default_tier not in profiles:
+        raise ValueError(f"SUMMARY_TIER must be one of {', '.join(profiles)}, got {default_tier!r}")
+    _profiles = {tier: InferenceProfile(**options) for tier, options in profiles.items()}
+    _default_tier = default_tier
+    _local_files_only = local_files_only
+
+
+def summary_tiers() -> List[str]:
+    return list(_profiles)
+
+
+def summary_profile(tier: Optional[str] = None) -> InferenceProfile:
+    """Profile for ``tier`` (the default tier when None); KeyError for an unknown tier."""
+    return _profiles[tier or _default_tier]
+
+
+@model_loader("summarizer")
+def get_bart_summarizer(model: str = SUMMARIZER_MODEL_NAME, quantize: bool = False, local_files_only: bool = False):
+    # Lazy-loads and caches one pipeline per profile; transformers is only imported here
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model, local_files_only=local_files_only)
+    seq2seq = AutoModelForSeq2SeqLM.from_pretrained(model, local_files_only=local_files_only)
+    if quantize:
+        seq2seq = quantize_linear_layers(seq2seq)
+    return pipeline(task="summarization", model=seq2seq, tokenizer=tokenizer)
+
+
+def _summarizer(profile: InferenceProfile):
+    return get_bart_summarizer(profile.model, profile.quantize, _local_files_only)
 
 
 def preload_summarizer() -> None:
-    """Ensure the summarizer model is loaded into memory."""
-    get_bart_summarizer()
+    """Ensure the default tier's summarizer model is loaded into memory."""
+    _summarizer(summary_profile())
 
 
-def summarize_text(text: str, max_length: int = 130, min_length: int = 30) -> Optional[str]:
-    if not text or not text.strip():
-        return None
-    summarizer = get_bart_summarizer()
-    # BART has a max token/length limit; pipeline handles chunking poorly, so truncate input
-    input_text = text.strip()
-    if len(input_text) > 4000:
-        input_text = input_text[:4000]
-    result = summarizer(
-        input_text,
+def summary_strategy(long_document: bool, max_chunks: Optional[int] = None) -> str:
+    """Label for how a summary was produced; part of the summary cache key."""
+    if not long_document:
+        return "truncate"
+    return f"map-reduce:{max_chunks or 'all'}"
+
+
+def chunk_text(text: str, tokenizer, max_tokens: int = MAX_CHUNK_TOKENS) -> List[str]:
+    """Split text into sentence-aligned chunks of at most ``max_tokens`` tokens.
+
+    Sentences longer than a whole chunk are cut on token boundaries.
+    """
+    sentences = [s for s in _SENTENCE_END_RE.split(text.strip()) if s]
+    if not sentences:
+        return []
+    token_ids = tokenizer(sentences, add_special_tokens=False)["input_ids"]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence, ids in zip(sentences, token_ids):
+        if len(ids) > max_tokens:
+            if current:
+                chunks.append(' '.join(current))
+                current, current_tokens = [], 0
+            for start in range(0, len(ids), max_tokens):
+                chunks.append(tokenizer.decode(ids[start:start + max_tokens], skip_special_tokens=True))
+            continue
+        if current_tokens + len(ids) > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += len(ids)
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def _select_chunks(chunks: List[str], max_chunks: Optional[int]) -> List[str]:
+    """Keep at most ``max_chunks`` chunks, spread evenly across the document."""
+    if not max_chunks or len(chunks) <= max_chunks:
+        return chunks
+    step = len(chunks) / max_chunks
+    return [chunks[int(i * step)] for i in range(max_chunks)]
+
+
+def _run(summarizer, inputs, max_length: int, min_length: int, batch_size: int = 1, num_beams: int = 0) -> List[str]:
+    generation = {"num_beams": num_beams} if num_beams else {}
+    results = summarizer(
+        inputs,
         max_length=max_length,
         min_length=min_length,
         do_sample=False,
+        truncation=True,
+        batch_size=batch_size,
         clean_up_tokenization_spaces=True,
+        **generation,
     )
-    if not result:
+    return [r.get("summary_text", "") for r in results or []]
+
+
+def summarize_long_text(
+    text: str,
+    max_length: int = 130,
+    min_length: int = 30,
+    max_chunks: Optional[int] = None,
+    batch_size: int = 4,
+    tier: Optional[str] = None,
+) -> Optional[str]:
+    """Map-reduce summary of a document of any length.
+
+    The text is split into token-aware chunks that fit BART's context, the
+    chunks are summarized in batched pipeline calls, and the joined partial
+    summaries are summarized again (repeating while they still overflow one
+    chunk). ``max_chunks`` bounds latency by sampling chunks evenly.
+    """
+    if not text or not text.strip():
+        return None
+    profile = summary_profile(tier)
+    summarizer = _summarizer(profile)
+    chunks = _select_chunks(chunk_text(text, summarizer.tokenizer), max_chunks)
+    if not chunks:
         return None
-    return result[0].get("summary_text")
+
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if len(chunks) == 1:
+            break
+        partials = _run(summarizer, chunks, max_length, min_length, batch_size=batch_size, num_beams=profile.num_beams)
+        chunks = chunk_text(' '.join(p for p in partials if p), summarizer.tokenizer)
+        if not chunks:
+            return None
+
+    # Normally a single chunk by now; anything left over is truncated by the pipeline
+    result = _run(summarizer, ' '.join(chunks), max_length, min_length, num_beams=profile.num_beams)
+    return result[0] if result and result[0] else None
 
 
+def summarize_texts(
+    texts: List[str],
+    max_length: int = 130,
+    min_length: int = 30,
+    batch_size: int = 4,
+    tier: Optional[str] = None,
+) -> List[Optional[str]]:
+    """Truncate-mode summaries of several texts in batched pipeline calls."""
+    profile = summary_profile(tier)
+    summarizer = _summarizer(profile)
+    # BART has a max token/length limit; pipeline handles chunking poorly, so truncate input
+    inputs = [text.strip()[:TRUNCATE_CHARS] for text in texts]
+    summaries = _run(summarizer, inputs, max_length, min_length, batch_size=batch_size, num_beams=profile.num_beams)
+    summaries += [None] * (len(inputs) - len(summaries))
+    return [summary or None for summary in summaries]
+
+
+def summarize_text(
+    text: str,
+    max_length: int = 130,
+    min_length: int = 30,
+    long_document: bool = False,
+    max_chunks: Optional[int] = None,
+    batch_size: int = 4,
+    tier: Optional[str] = None,
+) -> Optional[str]:
+    if not text or not text.strip():
+        return None
+    client = model_client.remote()
+    if client is not None:
+        with timed("summarize_long" if long_document else "summarize"):
+            return client.call(
+                "summarize", text, max_length=max_length, min_length=min_length,
+                long_document=long_document, max_chunks=max_chunks, batch_size=batch_size, tier=tier,
+            )
+    if long_document:
+        with timed("summarize_long"):
+            return summarize_long_text(
+                text, max_length=max_length, min_length=min_length,
+                max_chunks=max_chunks, batch_size=batch_size, tier=tier,
+            )
+    with timed("summarize"):
+        return summarize_texts([text], max_length=max_length, min_length=min_length, tier=tier)[0]
@@ -0,0 +1,72 @@
+import hashlib
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import db, Book, BookSummary
+from backend.ai_engine.summarizer import SUMMARIZER_MODEL_NAME
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_cached_summary(
+    book_id: int,
+    digest: str,
+    max_length: int,
+    min_length: int,
+    strategy: str,
+    model_name: str = SUMMARIZER_MODEL_NAME,
+) -> Optional[str]:
+    row = (
+        db.session.query(BookSummary.summary)
+        .filter_by(
+            book_id=book_id,
+            content_hash=digest,
+            max_length=max_length,
+            min_length=min_length,
+            model_name=model_name,
+            strategy=strategy,
+        )
+        .first()
+    )
+    return row.summary if row else None
+
+
+def store_summary(
+    book_id: int,
+    digest: str,
+    max_length: int,
+    min_length: int,
+    strategy: str,
+    summary: str,
+    model_name: str = SUMMARIZER_MODEL_NAME,
+) -> None:
+    """Persist a generated summary; a concurrent writer for the same key wins silently."""
+    db.session.add(BookSummary(
+        book_id=book_id,
+        content_hash=digest,
+        max_length=max_length,
+        min_length=min_length,
+        model_name=model_name,
+        strategy=strategy,
+        summary=summary,
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def purge_stale_summaries(book: Book) -> int:
+    """Delete cached summaries generated from content the book no longer has.
+
+    Adds the deletion to the session; the caller commits.
+    """
+    current = content_hash((book.content or '').strip())
+    return (
+        BookSummary.query
+        .filter(BookSummary.book_id == book.id, BookSummary.content_hash != current)
+        .delete(synchronize_session=False)
+    )
@@ -0,0 +1,406 @@
+"""On-disk embedding matrix shared by worker processes through ``numpy.memmap``.
+
+File layout (little endian)::
+
+    header   64 bytes: magic, dtype code, dim, row count, catalog version
+    matrix   rows x dim float16, or int8 quantized per row
+    ids      rows int64 book ids, ascending
+    scales   rows float32 per-row scales (int8 files only)
+
+Every process maps the same file, so the vectors are held once in the page
+cache however many workers run. Files are written next to their final path
+and swapped in with ``os.replace``; readers notice the swap with a ``stat``.
+
+Build the file for an existing catalog with:
+    python -m backend.ai_engine.vector_file [--dtype int8]
+"""
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from backend.metrics import timed
+from backend.ai_engine.vector_index import VectorIndex, top_k_rows
+
+
+MAGIC = b'LIBVECS1'
+HEADER = struct.Struct('<8sIIqq')
+HEADER_SIZE = 64
+DTYPES = {1: np.dtype(np.float16), 2: np.dtype(np.int8)}
+DTYPE_CODES = {'float16': 1, 'int8': 2}
+# Rows dequantized per step while scoring, bounding the float32 scratch space
+SCORE_BLOCK_ROWS = 16384
+
+
+def _align(offset: int) -> int:
+    return (offset + 63) // 64 * 64
+
+
+def _layout(n: int, dim: int, dtype: np.dtype) -> Tuple[int, int]:
+    """Byte offsets of the id and scale arrays."""
+    ids_offset = _align(HEADER_SIZE + n * dim * dtype.itemsize)
+    return ids_offset, ids_offset + n * 8
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Convert float32 rows to the file dtype; int8 also returns per-row scales."""
+    if dtype == 'float16':
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(matrix / scales[:, np.newaxis]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def read_version(path: str) -> Optional[int]:
+    """Catalog version recorded in an existing file, or None."""
+    try:
+        with open(path, 'rb') as f:
+            magic, _, _, _, version = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return version if magic == MAGIC else None
+
+
+def write_vector_file(
+    path: str,
+    chunks: Iterable[Tuple[Sequence[int], np.ndarray]],
+    version: int,
+    dtype: str = 'float16',
+) -> bool:
+    """Stream (ids, float32 rows) chunks, in ascending id order, into a new file at ``path``.
+
+    The file is written under a temporary name and atomically swapped in,
+    unless a file for a newer catalog version has appeared meanwhile.
+    Returns whether the swap happened.
+    """
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported vector file dtype {dtype!r}")
+    np_dtype = DTYPES[DTYPE_CODES[dtype]]
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    ids: List[np.ndarray] = []
+    scales: List[np.ndarray] = []
+    n, dim = 0, 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(b'\0' * HEADER_SIZE)
+            for chunk_ids, matrix in chunks:
+                if not len(chunk_ids):
+                    continue
+                dim = dim or matrix.shape[1]
+                quantized, chunk_scales = quantize(np.asarray(matrix, dtype=np.float32), dtype)
+                f.write(quantized.tobytes())
+                ids.append(np.asarray(chunk_ids, dtype=np.int64))
+                if chunk_scales is not None:
+                    scales.append(chunk_scales)
+                n += len(chunk_ids)
+            ids_offset, _ = _layout(n, dim, np_dtype)
+            f.write(b'\0' * (ids_offset - f.tell()))
+            for part in ids:
+                f.write(part.tobytes())
+            for part in scales:
+                f.write(part.tobytes())
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, DTYPE_CODES[dtype], dim, n, version))
+            f.flush()
+            os.fsync(f.fileno())
+        return _swap_in(tmp_path, path, version)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _swap_in(tmp_path: str, path: str, version: int) -> bool:
+    # The lock makes "is ours newer?" and the rename one step across processes
+    with open(f"{path}.lock", 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        current = read_version(path)
+        if current is not None and current > version:
+            return False
+        os.replace(tmp_path, path)
+        return True
+
+
+class MappedVectors:
+    """Read-only view of one vector file."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            magic, code, dim, n, version = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or code not in DTYPES:
+            raise ValueError(f"{path} is not a vector file")
+        self.dtype = DTYPES[code]
+        self.dim = dim or None
+        self.version = version
+        self.size = n
+        if not n:
+            self.matrix = np.empty((0, 0), dtype=self.dtype)
+            self.ids = np.empty(0, dtype=np.int64)
+            self.scales = None
+            return
+        ids_offset, scales_offset = _layout(n, dim, self.dtype)
+        self.matrix = np.memmap(path, dtype=self.dtype, mode='r', offset=HEADER_SIZE, shape=(n, dim))
+        self.ids = np.memmap(path, dtype=np.int64, mode='r', offset=ids_offset, shape=(n,))
+        self.scales = (
+            np.memmap(path, dtype=np.float32, mode='r', offset=scales_offset, shape=(n,))
+            if self.dtype == np.int8 else None
+        )
+
+    def rows_of(self, book_ids: Iterable[int]) -> np.ndarray:
+        """Rows of the given ids that are present in the file."""
+        wanted = np.fromiter(book_ids, dtype=np.int64)
+        if not self.size or not len(wanted):
+            return np.empty(0, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.ids, wanted), self.size - 1)
+        return rows[self.ids[rows] == wanted]
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Dequantized float32 copies of the given rows."""
+        out = self.matrix[rows].astype(np.float32)
+        if self.scales is not None:
+            out *= self.scales[rows][:, np.newaxis]
+        return out
+
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dot products of each query with every row (or the given rows), dequantizing block by block."""
+        if rows is not None:
+            return queries @ self.vectors(rows).T
+        out = np.empty((len(queries), self.size), dtype=np.float32)
+        for start in range(0, self.size, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, self.size)
+            out[:, start:end] = queries @ self.matrix[start:end].astype(np.float32).T
+            if self.scales is not None:
+                out[:, start:end] *= self.scales[start:end]
+        return out
+
+
+class MappedVectorIndex:
+    """``VectorIndex`` work-alike over a shared vector file.
+
+    Vectors this process writes go to a small resident overlay that shadows
+    the file, so its own changes are visible at once. Each overlay entry is
+    tagged with the catalog version after its write; when a file built from
+    that version or later is swapped in, the entry is dropped.
+    """
+
+    def __init__(self, path: str, version_source: Callable[[], int], check_interval: float = 1.0):
+        self.path = path
+        self._version_source = version_source
+        self._check_interval = check_interval
+        self._lock = threading.RLock()
+        self._base: Optional[MappedVectors] = None
+        self._stat_key = None
+        self._checked_at = 0.0
+        self._overlay = VectorIndex()
+        self._removed: Set[int] = set()
+        self._tags: Dict[int, int] = {}
+        self._generation = 0
+        self._reload()
+
+    # -- file swaps --------------------------------------------------------
+
+    def _reload(self) -> None:
+        st = os.stat(self.path)
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key == self._stat_key:
+            return
+        base = MappedVectors(self.path)
+        with self._lock:
+            self._base, self._stat_key = base, key
+            self._generation += 1
+            for book_id, tag in list(self._tags.items()):
+                if tag <= base.version:
+                    del self._tags[book_id]
+                    self._overlay.remove(book_id)
+                    self._removed.discard(book_id)
+        logging.info("Mapped vector file %s (%d rows, catalog version %d)", self.path, base.size, base.version)
+
+    def _current(self) -> MappedVectors:
+        now = time.monotonic()
+        if now - self._checked_at >= self._check_interval:
+            self._checked_at = now
+            try:
+                self._reload()
+            except (OSError, ValueError):
+                logging.exception("Could not reload vector file %s; keeping the mapped one", self.path)
+        return self._base
+
+    def _shadowed_rows(self, base: MappedVectors) -> np.ndarray:
+        with self._lock:
+            shadowed = self._removed | set(self._overlay.ids())
+        return base.rows_of(shadowed)
+
+    # -- VectorIndex interface ------------------------------------------------
+
+    def __len__(self) -> int:
+        base = self._current()
+        return base.size - len(self._shadowed_rows(base)) + len(self._overlay)
+
+    def __contains__(self, book_id: int) -> bool:
+        with self._lock:
+            if book_id in self._removed:
+                return False
+            if book_id in self._overlay:
+                return True
+        return len(self._current().rows_of([book_id])) > 0
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._overlay.dim or self._current().dim
+
+    @property
+    def generation(self) -> int:
+        # Also advances when another worker's file is swapped in
+        self._current()
+        return self._generation
+
+    def ids(self) -> List[int]:
+        base = self._current()
+        with self._lock:
+            shadowed = self._removed | set(self._overlay.ids())
+            overlay_ids = self._overlay.ids()
+        return [int(i) for i in base.ids if int(i) not in shadowed] + overlay_ids
+
+    def get(self, book_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            if book_id in self._removed:
+                return None
+            vec = self._overlay.get(book_id)
+        if vec is not None:
+            return vec
+        base = self._current()
+        rows = base.rows_of([book_id])
+        return base.vectors(rows)[0] if len(rows) else None
+
+    def upsert(self, book_id: int, vector: np.ndarray) -> None:
+        tag = self._version_source()
+        with self._lock:
+            self._overlay.upsert(book_id, vector)
+            self._removed.discard(book_id)
+            self._tags[book_id] = tag
+            self._generation += 1
+
+    def remove(self, book_id: int) -> bool:
+        tag = self._version_source()
+        with self._lock:
+            self._overlay.remove(book_id)
+            self._removed.add(book_id)
+            self._tags[book_id] = tag
+            self._generation += 1
+        return True
+
+    def search(
+        self,
+        query_vec: np.ndarray,
+        top_k: int = 5,
+        exclude_ids: Optional[Iterable[int]] = None,
+        candidate_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        query = np.asarray(query_vec, dtype=np.float32)
+        if candidate_ids is None:
+            return self.search_many(query[np.newaxis, :], top_k, [exclude_ids])[0]
+        if top_k <= 0:
+            return []
+
+        candidates = set(candidate_ids) - set(exclude_ids or ())
+        with self._lock:
+            shadowed = self._removed | set(self._overlay.ids())
+            ranking = self._overlay.search(query, top_k, candidate_ids=candidates)
+        base = self._current()
+        rows = base.rows_of(sorted(candidates - shadowed))
+        if len(rows):
+            with timed("top_k"):
+                top_idx, top_scores = top_k_rows(base.scores(query[np.newaxis, :], rows), top_k)
+            ranking += [(int(base.ids[rows[i]]), float(score)) for i, score in zip(top_idx[0], top_scores[0])]
+        return sorted(ranking, key=lambda item: -item[1])[:top_k]
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        exclude_ids: Optional[Sequence[Optional[Iterable[int]]]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        queries = np.asarray(queries, dtype=np.float32)
+        exclude_ids = exclude_ids or [None] * len(queries)
+        rankings = self._overlay.search_many(queries, top_k, exclude_ids)
+        base = self._current()
+        if not base.size or top_k <= 0 or not len(queries):
+            return rankings
+
+        with timed("top_k"):
+            scores = base.scores(queries)
+            scores[:, self._shadowed_rows(base)] = -np.inf
+            for row, excluded in enumerate(exclude_ids):
+                if excluded:
+                    scores[row, base.rows_of(excluded)] = -np.inf
+            top_idx, top_scores = top_k_rows(scores, top_k)
+        merged = []
+        for ranking, idx_row, score_row in zip(rankings, top_idx, top_scores):
+            ranking = ranking + [
+                (int(base.ids[i]), float(score)) for i, score in zip(idx_row, score_row) if np.isfinite(score)
+            ]
+            merged.append(sorted(ranking, key=lambda item: -item[1])[:top_k])
+        return merged
+
+
+class DebouncedRewrite:
+    """Runs ``fn`` in a background thread ``delay`` seconds after the first ``schedule`` call.
+
+    Calls arriving while one is pending are folded into it; runs never overlap.
+    """
+
+    def __init__(self, fn: Callable[[], None], delay: float, label: str = 'Vector file rewrite'):
+        self.fn = fn
+        self.delay = delay
+        self.label = label
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def schedule(self) -> None:
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self._run)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _run(self) -> None:
+        with self._lock:
+            self._timer = None
+        with self._run_lock:
+            try:
+                self.fn()
+            except Exception:
+                logging.exception("%s failed", self.label)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from backend.app import create_app
+    from backend.ai_engine.embedding_store import backfill_missing_embeddings, export_vector_file
+
+    parser = argparse.ArgumentParser(description='Write the shared embedding file from the embedding store')
+    parser.add_argument('--path', help='output file (default: VECTOR_FILE)')
+    parser.add_argument('--dtype', choices=sorted(DTYPE_CODES), help='storage type (default: VECTOR_FILE_DTYPE)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    app = create_app()
+    with app.app_context():
+        path = args.path or app.config['VECTOR_FILE']
+        if not path:
+            parser.error('no --path given and VECTOR_FILE is not set')
+        backfill_missing_embeddings()
+        export_vector_file(path, args.dtype or app.config['VECTOR_FILE_DTYPE'])
+        print('Wrote', path)
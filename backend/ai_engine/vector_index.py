@@ -0,0 +1,218 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.metrics import timed
+
+
+def top_k_rows(scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Column indices and values of each row's ``top_k`` largest scores, best first."""
+    k = min(top_k, scores.shape[1])
+    top_idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top_idx, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top_idx, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+class VectorIndex:
+    """Resident, incrementally updated matrix of normalized book vectors.
+
+    Vectors live in one contiguous float32 matrix with a parallel id array.
+    Replacing a book overwrites its row in place, deleting a book tombstones
+    the row, and the matrix is compacted once tombstones exceed
+    ``compact_ratio`` of the used rows. A query is a single matrix-vector
+    product over the used rows followed by an ``argpartition`` top-k.
+    """
+
+    def __init__(self, initial_capacity: int = 1024, compact_ratio: float = 0.25):
+        self._lock = threading.RLock()
+        self._initial_capacity = max(1, initial_capacity)
+        self._compact_ratio = compact_ratio
+        self._dim: Optional[int] = None
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0
+        self._tombstones = 0
+        self._row_of: Dict[int, int] = {}
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, book_id: int) -> bool:
+        return book_id in self._row_of
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every change of contents; cached search results are keyed on it."""
+        return self._generation
+
+    def _allocate(self, capacity: int, dim: int) -> None:
+        matrix = np.zeros((capacity, dim), dtype=np.float32)
+        ids = np.zeros(capacity, dtype=np.int64)
+        alive = np.zeros(capacity, dtype=bool)
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+            alive[:self._size] = self._alive[:self._size]
+        # Swap in whole arrays so concurrent readers holding the old ones stay valid
+        self._matrix, self._ids, self._alive = matrix, ids, alive
+
+    def _check_dim(self, dim: int) -> None:
+        if self._dim is None:
+            self._dim = dim
+            self._allocate(self._initial_capacity, dim)
+        elif dim != self._dim:
+            raise ValueError(f"Vector dimension {dim} does not match index dimension {self._dim}")
+
+    def load(self, ids: Sequence[int], matrix: np.ndarray) -> None:
+        """Replace the whole index contents in one go."""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        with self._lock:
+            self._generation += 1
+            self._dim = None
+            self._size = 0
+            self._tombstones = 0
+            self._row_of = {}
+            if not len(ids):
+                self._matrix = np.empty((0, 0), dtype=np.float32)
+                self._ids = np.empty(0, dtype=np.int64)
+                self._alive = np.empty(0, dtype=bool)
+                return
+            n, dim = matrix.shape
+            self._dim = dim
+            self._allocate(max(self._initial_capacity, n), dim)
+            self._matrix[:n] = matrix
+            self._ids[:n] = np.asarray(ids, dtype=np.int64)
+            self._alive[:n] = True
+            self._size = n
+            self._row_of = {int(book_id): row for row, book_id in enumerate(ids)}
+
+    def upsert(self, book_id: int, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._check_dim(int(vector.shape[0]))
+            self._generation += 1
+            row = self._row_of.get(book_id)
+            if row is not None:
+                self._matrix[row] = vector
+                return
+            if self._size == self._matrix.shape[0]:
+                self._allocate(self._matrix.shape[0] * 2, self._dim)
+            row = self._size
+            self._matrix[row] = vector
+            self._ids[row] = book_id
+            self._alive[row] = True
+            self._row_of[book_id] = row
+            self._size += 1
+
+    def remove(self, book_id: int) -> bool:
+        with self._lock:
+            row = self._row_of.pop(book_id, None)
+            if row is None:
+                return False
+            self._generation += 1
+            self._alive[row] = False
+            self._tombstones += 1
+            if self._tombstones > self._compact_ratio * self._size:
+                self.compact()
+            return True
+
+    def compact(self) -> None:
+        """Drop tombstoned rows, keeping the survivors in their current order."""
+        with self._lock:
+            if not self._tombstones:
+                return
+            keep = np.flatnonzero(self._alive[:self._size])
+            n = len(keep)
+            capacity = max(self._initial_capacity, n)
+            matrix = np.zeros((capacity, self._dim), dtype=np.float32)
+            ids = np.zeros(capacity, dtype=np.int64)
+            alive = np.zeros(capacity, dtype=bool)
+            matrix[:n] = self._matrix[keep]
+            ids[:n] = self._ids[keep]
+            alive[:n] = True
+            self._matrix, self._ids, self._alive = matrix, ids, alive
+            self._size = n
+            self._tombstones = 0
+            self._row_of = {int(book_id): row for row, book_id in enumerate(ids[:n])}
+
+    def ids(self) -> List[int]:
+        with self._lock:
+            return list(self._row_of)
+
+    def get(self, book_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._row_of.get(book_id)
+            return None if row is None else self._matrix[row].copy()
+
+    def search(
+        self,
+        query_vec: np.ndarray,
+        top_k: int = 5,
+        exclude_ids: Optional[Iterable[int]] = None,
+        candidate_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return up to ``top_k`` (book_id, score) pairs, best first.
+
+        With ``candidate_ids`` only the rows of those books are gathered and
+        scored, so a selective prefilter costs a fraction of a full scan.
+        """
+        query = np.asarray(query_vec, dtype=np.float32)
+        if candidate_ids is None:
+            return self.search_many(query[np.newaxis, :], top_k, [exclude_ids])[0]
+
+        excluded = set(exclude_ids or ())
+        with self._lock:
+            matrix, ids = self._matrix, self._ids
+            rows = np.fromiter(
+                (self._row_of[i] for i in candidate_ids if i in self._row_of and i not in excluded),
+                dtype=np.int64,
+            )
+        if not len(rows) or top_k <= 0:
+            return []
+
+        with timed("top_k"):
+            top_idx, top_scores = top_k_rows((matrix[rows] @ query)[np.newaxis, :], top_k)
+        return [(int(ids[rows[i]]), float(score)) for i, score in zip(top_idx[0], top_scores[0])]
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        exclude_ids: Optional[Sequence[Optional[Iterable[int]]]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """Rank a block of queries with one matrix product.
+
+        ``exclude_ids[i]``, when given, lists book ids left out of row ``i``'s
+        results. Memory is ``len(queries) * len(self)`` floats, so callers
+        ranking the whole catalog pass it in blocks.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        with self._lock:
+            size = self._size
+            matrix, ids, alive = self._matrix, self._ids, self._alive
+            excluded = [
+                [self._row_of[i] for i in (ex or ()) if i in self._row_of]
+                for ex in (exclude_ids or [None] * len(queries))
+            ]
+        if size == 0 or top_k <= 0 or not len(queries):
+            return [[] for _ in range(len(queries))]
+
+        with timed("top_k"):
+            scores = queries @ matrix[:size].T
+            scores[:, ~alive[:size]] = -np.inf
+            for row, rows in enumerate(excluded):
+                if rows:
+                    scores[row, rows] = -np.inf
+            top_idx, top_scores = top_k_rows(scores, top_k)
+        return [
+            [(int(ids[i]), float(score)) for i, score in zip(idx_row, score_row) if np.isfinite(score)]
+            for idx_row, score_row in zip(top_idx, top_scores)
+        ]
@@ -2,48 +2,117 @@ from flask import Flask
 from flask_cors import CORS
 import threading
 import logging
+from backend import metrics, storage
+from backend.admission import admission
 from backend.config import config
 from backend.models import db
-from backend.ai_engine.summarizer import preload_summarizer
-from backend.ai_engine.recommender import preload_recommender
+from backend.jobs import summary_jobs
+from backend.migrations import run_migrations
+from backend.ai_engine import model_client
+from backend.ai_engine.loading import configure_torch_threads, model_status
+from backend.ai_engine.summarizer import configure_summarizer, preload_summarizer
+from backend.ai_engine.query_cache import configure_search_cache
+from backend.ai_engine.recommender import configure_embedder, configure_query_batching, preload_recommender
 from backend.routes import api_bp
 
 
+STARTUP_PROFILES = ('full', 'lazy', 'catalog')
+
+
+def _preload_models_bg(flask_app: Flask):
+    # Recommender first: it is small and backs the vector index warm-up
+    from backend.ai_engine.embedding_store import get_vector_index
+
+    steps = [
+        ("recommender", preload_recommender),
+        ("vector index", get_vector_index),
+        ("summarizer", preload_summarizer),
+    ]
+    if model_client.remote() is not None:
+        # The model server owns the models; only the vector index lives here
+        steps = [("vector index", get_vector_index)]
+    for name, preload in steps:
+        try:
+            with flask_app.app_context():
+                preload()
+                logging.info("%s preloaded in background", name.capitalize())
+        except Exception:
+            logging.exception("Background %s preload failed", name)
+
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(config)
     CORS(app)
 
+    profile = app.config['STARTUP_PROFILE']
+    if profile not in STARTUP_PROFILES:
+        raise ValueError(f"STARTUP_PROFILE must be one of {', '.join(STARTUP_PROFILES)}, got {profile!r}")
+    app.config.setdefault('EMBED_ON_WRITE', profile != 'catalog')
+
+    storage.configure_engine_options(app)
     db.init_app(app)
+    storage.init_app(app)
+    metrics.init_app(app)
+    summary_jobs.init_app(app)
+    admission.init_app(app)
+    configure_torch_threads(app.config['TORCH_THREADS'])
+    offline = app.config['MODEL_LOCAL_FILES_ONLY']
+    configure_embedder(app.config['EMBEDDING_MODEL'], app.config['EMBEDDING_QUANTIZE'], offline)
+    configure_summarizer(app.config['SUMMARY_PROFILES'], app.config['SUMMARY_TIER'], offline)
+    configure_query_batching(app.config['ENCODE_BATCH_WINDOW_MS'], app.config['ENCODE_MAX_BATCH'])
+    configure_search_cache(
+        app.config['SEARCH_VECTOR_CACHE_SIZE'], app.config['SEARCH_RESULT_CACHE_SIZE'], app.config['SEARCH_CACHE_TTL'],
+    )
+    model_client.configure_model_server(
+        app.config['MODEL_SERVER_SOCKET'], app.config['MODEL_SERVER_AUTHKEY'], app.config['MODEL_SERVER_TIMEOUT'],
+    )
 
     # Register blueprints (lazy import to prevent circular deps)
     from backend.routes.books import books_bp
+    from backend.routes.bookings import bookings_bp
     app.register_blueprint(books_bp, url_prefix=f"{api_bp.url_prefix}/books")
+    app.register_blueprint(bookings_bp, url_prefix=f"{api_bp.url_prefix}/bookings")
+
+    @app.errorhandler(model_client.ModelServerError)
+    def model_server_unavailable(exc):
+        return {"error": str(exc)}, 503
 
     @app.route('/health')
     def health():
         return {"status": "ok"}
 
+    @app.route('/ready')
+    def ready():
+        """Per-model load state (from the model server when one is configured).
+
+        Only the "full" profile waits for models before reporting ready.
+        """
+        client = model_client.remote()
+        if client is None:
+            models = model_status()
+        else:
+            try:
+                models = client.call('status')['models']
+            except model_client.ModelServerError as exc:
+                models = {"model_server": {"state": "failed", "load_seconds": None, "error": str(exc)}}
+        loaded = all(m["state"] == "ready" for m in models.values())
+        is_ready = loaded or profile != 'full'
+        body = {"status": "ready" if is_ready else "loading", "profile": profile, "models": models}
+        return body, 200 if is_ready else 503
+
     with app.app_context():
         db.create_all()
-        # Keep recommender relatively light; load at startup
-        preload_recommender()
+        run_migrations()
 
-    # Start summarizer preload in the background to avoid blocking startup
-    def _preload_summarizer_bg(flask_app: Flask):
-        try:
-            with flask_app.app_context():
-                preload_summarizer()
-                logging.info("Summarizer preloaded in background")
-        except Exception:
-            logging.exception("Background summarizer preload failed")
-
-    threading.Thread(
-        target=_preload_summarizer_bg,
-        args=(app,),
-        name="summarizer-preload",
-        daemon=True,
-    ).start()
+    if profile == 'full':
+        # Models load off the request path so startup never blocks on them
+        threading.Thread(
+            target=_preload_models_bg,
+            args=(app,),
+            name="model-preload",
+            daemon=True,
+        ).start()
 
     return app
 
@@ -51,5 +120,3 @@ def create_app():
 if __name__ == '__main__':
     app = create_app()
     app.run(host='0.0.0.0', port=5000, debug=False)
-
-
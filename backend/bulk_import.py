@@ -0,0 +1,269 @@
+import csv
+import json
+import logging
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from flask import current_app
+
+from backend.catalog_version import bump_catalog_version
+from backend.dedup import (
+    LocalIndex,
+    book_signature,
+    find_near_duplicates,
+    index_signatures,
+    merge_duplicates,
+)
+from backend.models import db, Book
+from backend.ai_engine.embedding_store import (
+    blob_to_vector,
+    index_vectors,
+    refresh_book_embeddings,
+    unindex_book,
+)
+from backend.ai_engine.neighbors import update_neighbors
+
+
+MAX_REPORTED_ERRORS = 20
+# (title, author) pairs per existence query: two bound parameters each, below SQLite's limit
+_KEY_CHUNK = 250
+
+
+class ImportStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.near_duplicates = 0
+        self.merged = 0
+        self.invalid = 0
+        self.embedded = 0
+        self.errors: List[Dict] = []
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.elapsed if self.elapsed > 0 else 0.0
+
+    def add_error(self, line: int, message: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self) -> Dict:
+        return {
+            "read": self.read,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "near_duplicates": self.near_duplicates,
+            "merged": self.merged,
+            "invalid": self.invalid,
+            "embedded": self.embedded,
+            "errors": self.errors,
+            "seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def iter_csv_rows(csv_path: str) -> Iterator[Tuple[int, Dict]]:
+    """Stream (line number, row) pairs from a CSV file without loading it whole."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def iter_ndjson_rows(lines: Iterable, stats: ImportStats) -> Iterator[Tuple[int, Dict]]:
+    """Stream (line number, object) pairs from NDJSON, recording unparsable lines in ``stats``."""
+    for line_num, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            stats.read += 1
+            stats.add_error(line_num, f"Invalid JSON: {exc}")
+            continue
+        if not isinstance(row, dict):
+            stats.read += 1
+            stats.add_error(line_num, "Expected a JSON object")
+            continue
+        yield line_num, row
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _existing_keys(keys: Set[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    keys_list, existing = list(keys), set()
+    for start in range(0, len(keys_list), _KEY_CHUNK):
+        rows = (
+            db.session.query(Book.title, Book.author)
+            .filter(db.tuple_(Book.title, Book.author).in_(keys_list[start:start + _KEY_CHUNK]))
+            .all()
+        )
+        existing.update((row.title, row.author) for row in rows)
+    return existing
+
+
+def _book_fields(book: Book) -> Dict[str, Optional[str]]:
+    return {"genre": book.genre, "description": book.description, "content": book.content}
+
+
+def _apply_dedup_policy(books: List[Book], policy: str, threshold: float, embed: bool, stats: ImportStats):
+    """Check a batch for near-duplicates of the catalog and of its own earlier rows.
+
+    Returns (books to insert with their signatures, (book, pending target)
+    pairs still to be flagged once ids exist, catalog books changed by merges).
+    """
+    signatures = [book_signature(b.title, b.author, b.description) for b in books]
+    if policy == 'off':
+        return list(zip(books, signatures)), [], []
+
+    catalog_matches = find_near_duplicates(signatures, threshold)
+    local, local_books = LocalIndex(), []
+    kept: List[Tuple[Book, Optional[np.ndarray]]] = []
+    pending_flags: List[Tuple[Book, Book]] = []
+    local_merges: List[Tuple[Book, Dict[str, Optional[str]]]] = []
+    catalog_merges: Dict[int, List[Book]] = {}
+    for book, signature, match in zip(books, signatures, catalog_matches):
+        target: Union[int, Book, None] = None
+        if match is not None:
+            target = match.book_id
+        elif signature is not None:
+            local_match = local.best(signature, threshold)
+            if local_match is not None:
+                target = local_books[local_match.book_id]
+        if target is not None:
+            stats.near_duplicates += 1
+        if target is None or policy == 'flag':
+            if isinstance(target, Book):
+                pending_flags.append((book, target))
+            elif target is not None:
+                book.duplicate_of = target
+            kept.append((book, signature))
+            if signature is not None:
+                local.add(signature)
+                local_books.append(book)
+        elif policy == 'merge':
+            stats.merged += 1
+            if isinstance(target, Book):
+                local_merges.append((target, _book_fields(book)))
+            else:
+                catalog_merges.setdefault(target, []).append(book)
+        # policy == 'reject': the row is dropped
+
+    merges = local_merges
+    if catalog_merges:
+        targets = Book.query.options(db.undefer(Book.content)).filter(Book.id.in_(list(catalog_merges))).all()
+        merges += [(target, _book_fields(duplicate)) for target in targets for duplicate in catalog_merges[target.id]]
+    changed = merge_duplicates(merges, encode=embed)
+    # Batch rows merged into were signed before their fields were filled
+    resign = {target for target in changed if target.id is None}
+    if resign:
+        kept = [
+            (book, book_signature(book.title, book.author, book.description) if book in resign else signature)
+            for book, signature in kept
+        ]
+    return kept, pending_flags, [target for target in changed if target.id is not None]
+
+
+def _flush_batch(batch: List[Book], embed: bool, stats: ImportStats, policy: str, threshold: float) -> None:
+    keys = {(b.title, b.author) for b in batch}
+    existing = _existing_keys(keys)
+    books = [b for b in batch if (b.title, b.author) not in existing]
+    stats.duplicates += len(batch) - len(books)
+    kept, pending_flags, merged = _apply_dedup_policy(books, policy, threshold, embed, stats)
+    books = [b for b, _ in kept]
+    if not books and not merged:
+        return
+    db.session.add_all(books)
+    if embed:
+        # Encoded while the books are still pending so no per-row lazy loads happen
+        stats.embedded += refresh_book_embeddings(books)
+    db.session.flush()
+    for book, target in pending_flags:
+        book.duplicate_of = target.id
+    index_signatures([(b.id, signature) for b, signature in kept if signature is not None])
+    bump_catalog_version()
+    vectors = [(b.id, blob_to_vector(b.embedding.vector)) for b in books + merged if embed and b.embedding is not None]
+    db.session.commit()
+    stats.inserted += len(books)
+    index_vectors(vectors)
+    dropped = [target.id for target in merged if target.embedding is None]
+    for book_id in dropped:
+        unindex_book(book_id)
+    if not current_app.config['EMBED_ON_WRITE']:
+        # Deferred-embedding profile: searches re-encode and catch the index up
+        dropped = []
+    update_neighbors([book_id for book_id, _ in vectors] + dropped)
+
+
+def import_books(
+    rows: Iterable[Tuple[int, Dict]],
+    batch_size: int = 500,
+    embed: bool = True,
+    stats: Optional[ImportStats] = None,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+    dedup_policy: Optional[str] = None,
+) -> ImportStats:
+    """Insert books from a stream of (line number, row) pairs in committed batches.
+
+    Rows whose (title, author) already exists in the catalog, or earlier in the
+    same import, are skipped; the catalog check is one indexed lookup per
+    batch. Near-duplicates (MinHash similarity of at least ``DEDUP_THRESHOLD``)
+    are flagged, rejected or merged per ``dedup_policy`` (default
+    ``DEDUP_POLICY``). With ``embed`` each batch's embeddings are computed in a
+    single model call before it is committed. ``progress`` is called after every batch.
+    """
+    stats = stats or ImportStats()
+    policy = dedup_policy or current_app.config['DEDUP_POLICY']
+    threshold = current_app.config['DEDUP_THRESHOLD']
+    seen: Set[Tuple[str, str]] = set()
+    batch: List[Book] = []
+    for line_num, row in rows:
+        stats.read += 1
+        title, author = _clean(row.get('title')), _clean(row.get('author'))
+        if not title or not author:
+            stats.add_error(line_num, "'title' and 'author' are required")
+            continue
+        if (title, author) in seen:
+            stats.duplicates += 1
+            continue
+        seen.add((title, author))
+        batch.append(Book(
+            title=title,
+            author=author,
+            genre=_clean(row.get('genre')),
+            description=_clean(row.get('description')),
+            content=_clean(row.get('content')),
+        ))
+        if len(batch) >= batch_size:
+            _flush_batch(batch, embed, stats, policy, threshold)
+            batch = []
+            if progress:
+                progress(stats)
+    if batch:
+        _flush_batch(batch, embed, stats, policy, threshold)
+        if progress:
+            progress(stats)
+    return stats
+
+
+def log_progress(stats: ImportStats) -> None:
+    logging.info(
+        "Imported %d/%d rows (%d duplicates, %d invalid) at %.1f rows/s",
+        stats.inserted, stats.read, stats.duplicates, stats.invalid, stats.rows_per_second,
+    )
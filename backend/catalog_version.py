@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+
+from backend.models import db
+
+
+CATALOG_STATE_ID = 1
+
+# Stamps are read with plain SQL so conditional GETs never build ORM objects
+_CATALOG_STAMP_SQL = text("SELECT version, updated_at FROM catalog_state WHERE id = :id")
+_BOOK_STAMP_SQL = text("SELECT version, updated_at FROM books WHERE id = :id")
+_BUMP_SQL = text("UPDATE catalog_state SET version = version + 1, updated_at = :now WHERE id = :id")
+
+Stamp = Tuple[int, Optional[datetime]]
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    # SQLite hands raw text back to textual queries
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def ensure_catalog_state() -> None:
+    exists = db.session.execute(_CATALOG_STAMP_SQL, {"id": CATALOG_STATE_ID}).first()
+    if not exists:
+        db.session.execute(
+            text("INSERT INTO catalog_state (id, version, updated_at) VALUES (:id, 1, :now)"),
+            {"id": CATALOG_STATE_ID, "now": datetime.utcnow()},
+        )
+        db.session.commit()
+
+
+def bump_catalog_version() -> None:
+    """Increment the catalog version inside the caller's transaction."""
+    db.session.execute(_BUMP_SQL, {"id": CATALOG_STATE_ID, "now": datetime.utcnow()})
+
+
+def catalog_stamp() -> Stamp:
+    row = db.session.execute(_CATALOG_STAMP_SQL, {"id": CATALOG_STATE_ID}).first()
+    if row is None:
+        return 0, None
+    return int(row.version), _as_datetime(row.updated_at)
+
+
+def book_stamp(book_id: int) -> Optional[Stamp]:
+    row = db.session.execute(_BOOK_STAMP_SQL, {"id": book_id}).first()
+    if row is None:
+        return None
+    return int(row.version), _as_datetime(row.updated_at)
+
+
+def touch_book(book) -> None:
+    """Mark a book as changed: new per-book version and a catalog version bump."""
+    book.version = (book.version or 0) + 1
+    book.updated_at = datetime.utcnow()
+    bump_catalog_version()
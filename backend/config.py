@@ -3,9 +3,132 @@ import os
 
 class Config:
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(BASE_DIR, 'library.db')}"
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'library.db')}")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Adjusted to the database URL by storage.configure_engine_options: the pool sizes apply
+    # to file-backed SQLite and other databases, the timeout to SQLite only
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        # Seconds a connection waits on a locked database before raising "database is locked"
+        "connect_args": {"timeout": float(os.environ.get("SQLITE_BUSY_TIMEOUT", 30))},
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+    }
+    # Applied to every new SQLite connection. WAL lets readers proceed while a write is in
+    # progress; NORMAL sync is durable across application crashes in WAL mode.
+    SQLITE_PRAGMAS = {
+        "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "cache_size": int(os.environ.get("SQLITE_CACHE_KB", 65536)) * -1,  # negative = KiB
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_BYTES", 256 * 1024 * 1024)),
+        "busy_timeout": int(float(os.environ.get("SQLITE_BUSY_TIMEOUT", 30)) * 1000),
+        "temp_store": "MEMORY",
+    }
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
+    # "full": load models and the vector index in the background at boot (/ready waits for them)
+    # "lazy": load models on first use
+    # "catalog": like lazy, and writes defer embedding work until a search/recommendation needs it
+    STARTUP_PROFILE = os.environ.get("STARTUP_PROFILE", "full")
+    # Request/SQL/model instrumentation exposed at /metrics (Prometheus text format)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+    # GET /api/books/ page size when no ?limit= is given, and the largest allowed
+    BOOKS_PAGE_SIZE = int(os.environ.get("BOOKS_PAGE_SIZE", 50))
+    BOOKS_MAX_PAGE_SIZE = int(os.environ.get("BOOKS_MAX_PAGE_SIZE", 500))
+    # Summarization defaults: "long" map-reduces the full content, "truncate" reads only its start
+    SUMMARY_MODE = os.environ.get("SUMMARY_MODE", "long")
+    # Upper bound on chunks summarized per book in long mode (0 = no cap)
+    SUMMARY_MAX_CHUNKS = int(os.environ.get("SUMMARY_MAX_CHUNKS", 16))
+    SUMMARY_BATCH_SIZE = int(os.environ.get("SUMMARY_BATCH_SIZE", 4))
+    # Summarizer inference profiles, one per latency tier; a summarize request picks one with
+    # "tier" (default SUMMARY_TIER). "model" is a hub id or a local directory, "quantize" applies
+    # dynamic int8 quantization to the Linear layers, "num_beams" 0 keeps the model's own
+    # setting and "max_length" caps the requested summary length.
+    SUMMARY_PROFILES = {
+        "quality": {
+            "model": os.environ.get("SUMMARY_QUALITY_MODEL", "facebook/bart-large-cnn"),
+            "quantize": os.environ.get("SUMMARY_QUALITY_QUANTIZE", "0").lower() not in ("0", "false", "no"),
+            "num_beams": int(os.environ.get("SUMMARY_QUALITY_BEAMS", 0)),
+            "max_length": int(os.environ.get("SUMMARY_QUALITY_MAX_LENGTH", 512)),
+        },
+        "fast": {
+            "model": os.environ.get("SUMMARY_FAST_MODEL", "sshleifer/distilbart-cnn-12-6"),
+            "quantize": os.environ.get("SUMMARY_FAST_QUANTIZE", "1").lower() not in ("0", "false", "no"),
+            "num_beams": int(os.environ.get("SUMMARY_FAST_BEAMS", 1)),
+            "max_length": int(os.environ.get("SUMMARY_FAST_MAX_LENGTH", 130)),
+        },
+    }
+    SUMMARY_TIER = os.environ.get("SUMMARY_TIER", "quality")
+    # Sentence embedding model (hub id or local directory) and optional int8 quantization.
+    # Stored vectors are tagged with both; changing either re-encodes books as they are used.
+    EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_QUANTIZE = os.environ.get("EMBEDDING_QUANTIZE", "0").lower() not in ("0", "false", "no")
+    # Load models only from local directories or the local Hugging Face cache, never the network
+    MODEL_LOCAL_FILES_ONLY = os.environ.get("MODEL_LOCAL_FILES_ONLY", "0").lower() not in ("0", "false", "no")
+    # torch intra-op threads for in-process inference (0 = torch default of one per core)
+    TORCH_THREADS = int(os.environ.get("TORCH_THREADS", 0))
+    # Background summarization jobs: worker threads and how long finished results are kept (seconds)
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+    JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", 600))
+    # Query embedding micro-batching: concurrent encodes within the window share one model call
+    ENCODE_BATCH_WINDOW_MS = float(os.environ.get("ENCODE_BATCH_WINDOW_MS", 5))
+    ENCODE_MAX_BATCH = int(os.environ.get("ENCODE_MAX_BATCH", 32))
+    # Shared embedding file mapped by every worker instead of a per-process float32 index
+    # (empty = per-process index). Rewritten VECTOR_FILE_REWRITE_DELAY seconds after writes;
+    # workers check for a swapped file every VECTOR_FILE_CHECK_INTERVAL seconds.
+    VECTOR_FILE = os.environ.get("VECTOR_FILE", "")
+    VECTOR_FILE_DTYPE = os.environ.get("VECTOR_FILE_DTYPE", "float16")  # "float16" or "int8"
+    VECTOR_FILE_REWRITE_DELAY = float(os.environ.get("VECTOR_FILE_REWRITE_DELAY", 5))
+    VECTOR_FILE_CHECK_INTERVAL = float(os.environ.get("VECTOR_FILE_CHECK_INTERVAL", 1))
+    # Length of each book's stored neighbour list (python -m backend.ai_engine.neighbors),
+    # and the largest top_k recommendations accept
+    RECOMMENDATION_NEIGHBORS = int(os.environ.get("RECOMMENDATION_NEIGHBORS", 20))
+    # Unix socket of the shared model server (python -m backend.ai_engine.model_server). When set,
+    # workers send embedding/summarization there instead of loading the models themselves.
+    MODEL_SERVER_SOCKET = os.environ.get("MODEL_SERVER_SOCKET", "")
+    # Shared key for model server connections; unset, the server writes one to <socket>.key (0600)
+    MODEL_SERVER_AUTHKEY = os.environ.get("MODEL_SERVER_AUTHKEY", "")
+    # Seconds a worker waits for a model server reply
+    MODEL_SERVER_TIMEOUT = float(os.environ.get("MODEL_SERVER_TIMEOUT", 600))
+    # Model server side: torch intra-op threads (0 = torch default) and queued requests per model
+    MODEL_SERVER_TORCH_THREADS = int(os.environ.get("MODEL_SERVER_TORCH_THREADS", 0))
+    MODEL_SERVER_MAX_QUEUE = int(os.environ.get("MODEL_SERVER_MAX_QUEUE", 64))
+    # Most book ids accepted by one GET /api/bookings/availability call
+    AVAILABILITY_MAX_IDS = int(os.environ.get("AVAILABILITY_MAX_IDS", 500))
+    # Rows read per query while streaming GET /api/books/export
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+    # Semantic search caches: normalized query -> vector, and query + filters -> ranked ids.
+    # Results are keyed on the catalog version, so any book write invalidates them. 0 disables.
+    SEARCH_VECTOR_CACHE_SIZE = int(os.environ.get("SEARCH_VECTOR_CACHE_SIZE", 2048))
+    SEARCH_RESULT_CACHE_SIZE = int(os.environ.get("SEARCH_RESULT_CACHE_SIZE", 1024))
+    SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 600))
+    # Admission control for model-backed endpoints: (requests running at once, requests allowed
+    # to wait for a slot); concurrency 0 disables a limit. A full queue answers 429, a wait past
+    # ADMISSION_QUEUE_TIMEOUT seconds (or the client's X-Request-Timeout) 503, both with Retry-After.
+    ADMISSION_LIMITS = {
+        "summarize": (
+            int(os.environ.get("ADMISSION_SUMMARIZE_CONCURRENCY", 2)),
+            int(os.environ.get("ADMISSION_SUMMARIZE_QUEUE", 8)),
+        ),
+        "recommend": (
+            int(os.environ.get("ADMISSION_RECOMMEND_CONCURRENCY", 8)),
+            int(os.environ.get("ADMISSION_RECOMMEND_QUEUE", 32)),
+        ),
+        # Searches encode their query inside the slot: at least ENCODE_MAX_BATCH lets the
+        # query batcher fill a model call
+        "search": (
+            int(os.environ.get("ADMISSION_SEARCH_CONCURRENCY", ENCODE_MAX_BATCH)),
+            int(os.environ.get("ADMISSION_SEARCH_QUEUE", 32)),
+        ),
+    }
+    ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 10))
+    # Near-duplicate detection at ingest (POST /api/books/ and bulk imports): a MinHash similarity
+    # of title/author/description shingles of at least DEDUP_THRESHOLD marks a duplicate.
+    # DEDUP_POLICY: "flag" stores it with duplicate_of set, "reject" refuses it, "merge" fills the
+    # existing book's empty fields from it instead, "off" skips the check.
+    DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", 0.8))
+    DEDUP_POLICY = os.environ.get("DEDUP_POLICY", "flag")
+    # Rows per committed batch for POST /api/books/bulk, and the most ?batch_size= may ask for
+    BULK_IMPORT_BATCH_SIZE = int(os.environ.get("BULK_IMPORT_BATCH_SIZE", 500))
+    BULK_IMPORT_MAX_BATCH_SIZE = int(os.environ.get("BULK_IMPORT_MAX_BATCH_SIZE", 2000))
 
 
 config = Config()
@@ -0,0 +1,303 @@
+"""Near-duplicate detection at ingest with MinHash signatures and LSH buckets.
+
+Each book gets a MinHash signature over shingles of its normalized title,
+author and description (``book_minhashes``) and one bucket row per LSH band
+(``book_lsh_buckets``). Finding candidates for a new book is one indexed
+bucket lookup; only those candidates' signatures are compared.
+
+Usage:
+    python -m backend.dedup    # index books without a current signature
+"""
+import re
+import zlib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from backend.catalog_version import touch_book
+from backend.models import db, Book, BookLshBucket, BookMinHash
+from backend.ai_engine.embedding_store import refresh_book_embeddings
+
+
+DEDUP_POLICIES = ('flag', 'reject', 'merge', 'off')
+
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Descriptions are shingled up to this many words
+MAX_DESCRIPTION_WORDS = 200
+# Ids or buckets per IN (...) query
+LOOKUP_CHUNK = 500
+
+# Bumped whenever shingling or hashing changes; rows of another version are never compared
+SIGNATURE_VERSION = 2
+
+# Fixed seed: stored signatures are only comparable when computed with the same permutations
+_rng = np.random.default_rng(20240501)
+_PERM_SEEDS = _rng.integers(0, np.iinfo(np.uint64).max, NUM_PERM, dtype=np.uint64, endpoint=True)
+# Odd multipliers and per-band salts hashing a band's values to one 64-bit bucket key
+_BAND_MIX = _rng.integers(1, 1 << 63, ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.integers(0, 1 << 63, BANDS, dtype=np.uint64)
+
+_BRACKETED_RE = re.compile(r'[(\[][^)\]]*[)\]]')
+_NON_WORD_RE = re.compile(r'[\W_]+')
+# Edition notes that do not make a different book
+_EDITION_WORDS = {
+    'edition', 'ed', 'revised', 'abridged', 'unabridged', 'illustrated', 'annotated', 'deluxe',
+    'anniversary', 'paperback', 'hardcover', 'reprint', 'expanded', 'updated',
+    '1st', '2nd', '3rd', '4th', '5th', '6th', '7th', '8th', '9th', '10th',
+}
+
+
+class Match(NamedTuple):
+    book_id: int
+    similarity: float
+
+
+def _words(text: Optional[str]) -> List[str]:
+    return _NON_WORD_RE.sub(' ', (text or '').lower()).split()
+
+
+def shingles(title: Optional[str], author: Optional[str], description: Optional[str]) -> Set[str]:
+    """Features compared between books, tagged by the field they come from.
+
+    Title: character 3-grams after dropping bracketed and edition notes.
+    Author: its words, so "Tolkien, J.R.R." and "J.R.R. Tolkien" agree.
+    Description: word 3-grams of its opening.
+    """
+    features: Set[str] = set()
+    title_words = [w for w in _words(_BRACKETED_RE.sub(' ', title or '')) if w not in _EDITION_WORDS]
+    title_text = ' '.join(title_words)
+    if len(title_text) <= 3:
+        features.add('t:' + title_text)
+    else:
+        features.update('t:' + title_text[i:i + 3] for i in range(len(title_text) - 2))
+    features.update('a:' + word for word in _words(author))
+    words = _words(description)[:MAX_DESCRIPTION_WORDS]
+    features.update('d:' + ' '.join(words[i:i + 3]) for i in range(max(0, len(words) - 2)))
+    features.discard('t:')
+    return features
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer (wrapping uint64 arithmetic): every input bit affects every output bit."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def minhash(features: Iterable[str]) -> Optional[np.ndarray]:
+    """``NUM_PERM`` uint32 MinHash values of a feature set, or None when it is empty.
+
+    Permutation ``i`` hashes each feature as ``mix64(crc32(feature) ^ seed_i)``
+    with a random 64-bit seed, so the minimum is decided by all bits of the
+    feature hash and the estimate tracks the true Jaccard similarity.
+    """
+    hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features), dtype=np.uint64)
+    if not len(hashes):
+        return None
+    permuted = _mix64(_PERM_SEEDS[:, None] ^ hashes[None, :])
+    # The high half of the minimum; equal values across two books mean the same feature won
+    return (permuted.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+
+def book_signature(title: Optional[str], author: Optional[str], description: Optional[str]) -> Optional[np.ndarray]:
+    return minhash(shingles(title, author, description))
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket key per band (it must fit an SQLite INTEGER)."""
+    bands = signature.reshape(BANDS, ROWS_PER_BAND).astype(np.uint64)
+    # uint64 arithmetic wraps around, which is what the hash wants
+    keys = (bands * _BAND_MIX).sum(axis=1, dtype=np.uint64) ^ _BAND_SALT
+    return keys.view(np.int64).tolist()
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the feature sets behind two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+# -- persistence ---------------------------------------------------------------
+
+
+def index_signatures(items: Sequence[Tuple[int, np.ndarray]]) -> None:
+    """Store (book_id, signature) pairs and their buckets; the caller commits."""
+    if not items:
+        return
+    # Core inserts on the tables: a plain executemany, without ORM bulk bookkeeping
+    db.session.execute(
+        BookMinHash.__table__.insert(),
+        [{"book_id": book_id, "signature": sig.tobytes(), "version": SIGNATURE_VERSION} for book_id, sig in items],
+    )
+    db.session.execute(
+        BookLshBucket.__table__.insert(),
+        [{"bucket": bucket, "book_id": book_id} for book_id, sig in items for bucket in band_buckets(sig)],
+    )
+
+
+def _drop_signatures(book_ids: Sequence[int]) -> None:
+    for start in range(0, len(book_ids), LOOKUP_CHUNK):
+        chunk = book_ids[start:start + LOOKUP_CHUNK]
+        db.session.execute(db.delete(BookLshBucket).where(BookLshBucket.book_id.in_(chunk)))
+        db.session.execute(db.delete(BookMinHash).where(BookMinHash.book_id.in_(chunk)))
+
+
+def refresh_signature(book: Book) -> None:
+    """Recompute a flushed book's signature after its title, author or description changed."""
+    _drop_signatures([book.id])
+    db.session.expire(book, ['minhash', 'lsh_buckets'])
+    signature = book_signature(book.title, book.author, book.description)
+    if signature is not None:
+        index_signatures([(book.id, signature)])
+
+
+def _stored_signatures(book_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Signatures of ``book_ids`` as rows of one matrix, in the given order, and which rows were found.
+
+    Rows from another ``SIGNATURE_VERSION`` are left out until the backfill
+    recomputes them.
+    """
+    position = {book_id: row for row, book_id in enumerate(book_ids)}
+    matrix = np.zeros((len(book_ids), NUM_PERM), dtype=np.uint32)
+    found = np.zeros(len(book_ids), dtype=bool)
+    for start in range(0, len(book_ids), LOOKUP_CHUNK):
+        rows = db.session.query(BookMinHash.book_id, BookMinHash.signature).filter(
+            BookMinHash.book_id.in_(book_ids[start:start + LOOKUP_CHUNK]),
+            BookMinHash.version == SIGNATURE_VERSION,
+        )
+        for row in rows:
+            matrix[position[row.book_id]] = np.frombuffer(row.signature, dtype=np.uint32)
+            found[position[row.book_id]] = True
+    return matrix, found
+
+
+def find_near_duplicates(signatures: Sequence[Optional[np.ndarray]], threshold: float) -> List[Optional[Match]]:
+    """Best catalog match at or above ``threshold`` for each signature (None entries are skipped).
+
+    All signatures' buckets are looked up together through the bucket index,
+    then each signature is compared only with the candidates sharing a bucket.
+    """
+    buckets = [band_buckets(sig) if sig is not None else [] for sig in signatures]
+    wanted = list({bucket for keys in buckets for bucket in keys})
+    members: Dict[int, List[int]] = {}
+    for start in range(0, len(wanted), LOOKUP_CHUNK):
+        rows = db.session.query(BookLshBucket.bucket, BookLshBucket.book_id).filter(
+            BookLshBucket.bucket.in_(wanted[start:start + LOOKUP_CHUNK])
+        )
+        for row in rows:
+            members.setdefault(row.bucket, []).append(row.book_id)
+    if not members:
+        return [None] * len(signatures)
+
+    candidate_ids = sorted({book_id for ids in members.values() for book_id in ids})
+    row_of = {book_id: row for row, book_id in enumerate(candidate_ids)}
+    stored, found = _stored_signatures(candidate_ids)
+    matches: List[Optional[Match]] = []
+    for sig, keys in zip(signatures, buckets):
+        rows = [row for row in {row_of[book_id] for key in keys for book_id in members.get(key, ())} if found[row]]
+        if not rows:
+            matches.append(None)
+            continue
+        scores = np.count_nonzero(stored[rows] == sig, axis=1) / NUM_PERM
+        best = int(np.argmax(scores))
+        matches.append(Match(candidate_ids[rows[best]], float(scores[best])) if scores[best] >= threshold else None)
+    return matches
+
+
+class LocalIndex:
+    """In-memory LSH over signatures not in the database yet, e.g. the rows of one import batch."""
+
+    def __init__(self):
+        self._buckets: Dict[int, List[int]] = {}
+        self._signatures: List[np.ndarray] = []
+
+    def best(self, signature: np.ndarray, threshold: float) -> Optional[Match]:
+        """Best added entry at or above ``threshold``; ``book_id`` is its position in add order."""
+        candidates = list({pos for key in band_buckets(signature) for pos in self._buckets.get(key, ())})
+        if not candidates:
+            return None
+        scores = np.count_nonzero(np.stack([self._signatures[pos] for pos in candidates]) == signature, axis=1) / NUM_PERM
+        best = int(np.argmax(scores))
+        return Match(candidates[best], float(scores[best])) if scores[best] >= threshold else None
+
+    def add(self, signature: np.ndarray) -> int:
+        pos = len(self._signatures)
+        self._signatures.append(signature)
+        for key in band_buckets(signature):
+            self._buckets.setdefault(key, []).append(pos)
+        return pos
+
+
+def merge_into(target: Book, fields: Dict[str, Optional[str]]) -> bool:
+    """Fill the target's empty genre/description/content from a duplicate; True if anything changed."""
+    changed = False
+    for field in ('genre', 'description', 'content'):
+        if fields.get(field) and not getattr(target, field):
+            setattr(target, field, fields[field])
+            changed = True
+    return changed
+
+
+def merge_duplicates(merges: Iterable[Tuple[Book, Dict[str, Optional[str]]]], encode: bool = True) -> List[Book]:
+    """Fold each duplicate's fields into its target, in order, and bring changed targets up to date.
+
+    The one merge path for single creates and imports. Changed stored targets
+    are re-signed, touched and re-encoded in one batch (with ``encode=False``
+    their stale embeddings are dropped). Targets not flushed yet, e.g. earlier
+    rows of an import batch, are signed and encoded by the caller when it
+    inserts them. Returns the changed targets; the caller commits.
+    """
+    changed: List[Book] = []
+    for target, fields in merges:
+        if merge_into(target, fields) and not any(target is book for book in changed):
+            changed.append(target)
+    stored = [target for target in changed if target.id is not None]
+    for target in stored:
+        refresh_signature(target)
+        touch_book(target)
+    refresh_book_embeddings(stored, encode=encode)
+    return changed
+
+
+def backfill_signatures(batch_size: int = 1000) -> int:
+    """Index books without a current signature: rows from before dedup existed or from an older
+    ``SIGNATURE_VERSION``. Commits per batch.
+    """
+    total, last_id = 0, 0
+    while True:
+        books = (
+            db.session.query(Book.id, Book.title, Book.author, Book.description)
+            .outerjoin(BookMinHash, BookMinHash.book_id == Book.id)
+            .filter(
+                db.or_(BookMinHash.book_id.is_(None), BookMinHash.version != SIGNATURE_VERSION),
+                Book.id > last_id,
+            )
+            .order_by(Book.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not books:
+            return total
+        items = [(book.id, book_signature(book.title, book.author, book.description)) for book in books]
+        _drop_signatures([book_id for book_id, _ in items])
+        index_signatures([(book_id, sig) for book_id, sig in items if sig is not None])
+        db.session.commit()
+        total += len(items)
+        last_id = books[-1].id
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from backend.app import create_app
+
+    parser = argparse.ArgumentParser(description='Index existing books for near-duplicate detection')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print('Indexed', backfill_signatures(args.batch_size), 'books')
@@ -0,0 +1,103 @@
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import column, table, text
+
+from backend.models import db
+
+
+FTS_TABLE = 'books_fts'
+# Column weights for bm25(): title, author, genre, description
+FTS_RANK = 'bm25(10.0, 5.0, 2.0, 1.0)'
+
+books_fts = table(FTS_TABLE, column('rowid'), column('rank'))
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_available = False
+
+_CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, author, genre, description,
+        content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, author, genre, description)
+        VALUES (new.id, new.title, new.author, new.genre, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, genre, description)
+        VALUES ('delete', old.id, old.title, old.author, old.genre, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, genre, description ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, genre, description)
+        VALUES ('delete', old.id, old.title, old.author, old.genre, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, author, genre, description)
+        VALUES (new.id, new.title, new.author, new.genre, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{FTS_RANK}')",
+    # Backfill every existing book into the freshly created index
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def fts_available() -> bool:
+    return _available
+
+
+def ensure_fts_index() -> bool:
+    """Create, wire up and backfill the FTS5 index over ``books`` if missing.
+
+    The index is an external-content table kept in sync by triggers, so every
+    write path (routes, seeding, raw SQL) updates it. Returns whether full-text
+    search can be used; on non-SQLite engines or SQLite builds without FTS5 the
+    caller falls back to ``LIKE`` filtering.
+    """
+    global _available
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        _available = False
+        return False
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first()
+            if not exists:
+                for statement in _CREATE_STATEMENTS:
+                    conn.execute(text(statement))
+                logging.info("Created and backfilled %s", FTS_TABLE)
+        _available = True
+    except Exception:
+        logging.exception("FTS5 index unavailable; falling back to LIKE search")
+        _available = False
+    return _available
+
+
+def build_match_expression(search: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    tokens = _TOKEN_RE.findall(search)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def fts_match_subquery(match: str):
+    """(book_id, rank) rows for a MATCH expression; lower rank is a better bm25 hit."""
+    return (
+        db.select(books_fts.c.rowid.label('book_id'), books_fts.c.rank.label('rank'))
+        .select_from(books_fts)
+        .where(text(f"{FTS_TABLE} MATCH :match").bindparams(match=match))
+        .subquery()
+    )
@@ -0,0 +1,106 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from flask import Flask
+
+
+class Job:
+    def __init__(self, key: Hashable):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = 'queued'  # queued -> running -> done | failed
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Bounded background worker pool with single-flight deduplication.
+
+    Submitting a key that already has a queued or running job returns that
+    job instead of starting new work. Finished jobs are kept for
+    ``JOB_RESULT_TTL`` seconds so clients can poll for the result.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[Hashable, Job] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._app: Optional[Flask] = None
+        self._result_ttl = 600.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self._app = app
+        self._result_ttl = float(app.config.get('JOB_RESULT_TTL', 600))
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(app.config.get('JOB_WORKERS', 2)),
+            thread_name_prefix='job-worker',
+        )
+        app.extensions['jobs'] = self
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Job, bool]:
+        """Run ``fn`` in the pool unless ``key`` is already in flight.
+
+        Returns (job, created). ``fn`` runs inside an application context.
+        """
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(key)
+            if job is not None:
+                return job, False
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs) -> None:
+        job.status = 'running'
+        try:
+            with self._app.app_context():
+                job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except Exception as exc:
+            self._app.logger.exception("Job %s failed", job.id)
+            job.error = str(exc) or exc.__class__.__name__
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self._result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+summary_jobs = JobManager()
@@ -0,0 +1,229 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+
+from backend.models import db
+
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(key)} {value}'
+
+
+class Gauge(Counter):
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label key -> [per-bucket counts..., sum, count]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                yield f'{self.name}_bucket{_format_labels(key, [("le", repr(float(bound)))])} {count}'
+            yield f'{self.name}_bucket{_format_labels(key, [("le", "+Inf")])} {state[-1]}'
+            yield f'{self.name}_sum{_format_labels(key)} {state[-2]}'
+            yield f'{self.name}_count{_format_labels(key)} {state[-1]}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._metrics.setdefault(name, Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by endpoint, method and status.')
+REQUEST_DB_QUERIES = registry.histogram(
+    'http_request_db_queries', 'SQL statements issued per HTTP request.', COUNT_BUCKETS)
+REQUEST_DB_SECONDS = registry.histogram(
+    'http_request_db_seconds', 'Time spent executing SQL per HTTP request.')
+DB_QUERY_SECONDS = registry.histogram(
+    'db_query_duration_seconds', 'Latency of individual SQL statements.')
+MODEL_SECONDS = registry.histogram(
+    'model_operation_seconds', 'Time spent in model inference and vector ranking, by operation.')
+SEARCH_CACHE_REQUESTS = registry.counter(
+    'search_cache_requests_total', 'Semantic search cache lookups, by cache and result (hit or miss).')
+ADMISSION_IN_FLIGHT = registry.gauge(
+    'admission_in_flight', 'Admitted requests currently running, by limited endpoint.')
+ADMISSION_QUEUED = registry.gauge(
+    'admission_queued', 'Requests waiting for a slot, by limited endpoint.')
+ADMISSION_REJECTED = registry.counter(
+    'admission_rejected_total', 'Requests shed by admission control, by endpoint and reason.')
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    'admission_wait_seconds', 'Time admitted requests waited for a slot.')
+
+_enabled = False
+_NULL_TIMER = nullcontext()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+@contextmanager
+def _timer(histogram: Histogram, labels: Dict[str, str]):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+
+def timed(op: str, histogram: Optional[Histogram] = None):
+    """Context manager timing a block into ``model_operation_seconds{op=...}``.
+
+    Returns a shared no-op context when metrics are disabled.
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return _timer(histogram or MODEL_SECONDS, {"op": op})
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    DB_QUERY_SECONDS.observe(elapsed)
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_seconds += elapsed
+
+
+def _handle_db_error(context):
+    # after_cursor_execute does not fire for failed statements; drop their start time
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def init_app(app: Flask) -> None:
+    """Install request/SQL instrumentation and ``/metrics`` when ``METRICS_ENABLED``.
+
+    When disabled nothing is hooked in and ``timed`` blocks cost one flag check.
+    """
+    global _enabled
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    _enabled = True
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(db.engine, 'handle_error', _handle_db_error)
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        if endpoint != 'metrics':
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                endpoint=endpoint, method=request.method, status=response.status_code,
+            )
+            REQUEST_DB_QUERIES.observe(g.db_queries, endpoint=endpoint)
+            REQUEST_DB_SECONDS.observe(g.db_seconds, endpoint=endpoint)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,52 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+from backend.catalog_version import ensure_catalog_state
+from backend.fts import ensure_fts_index
+from backend.models import db
+
+
+def _add_column_if_missing(table: str, column: str, ddl: str, backfill: str = None) -> None:
+    """ALTER TABLE ... ADD COLUMN for columns added to a model after its table existed."""
+    existing = {col['name'] for col in inspect(db.engine).get_columns(table)}
+    if column in existing:
+        return
+    logging.info("Adding column %s.%s", table, column)
+    with db.engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        if backfill:
+            conn.execute(text(backfill))
+
+
+def _create_missing_indexes() -> None:
+    """Create indexes declared on models after their tables already existed."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def run_migrations() -> None:
+    """Bring an existing database up to date; safe to run on every startup.
+
+    ``db.create_all()`` only creates missing tables, so anything it cannot
+    express (virtual tables, triggers, backfills) is applied here.
+    """
+    _add_column_if_missing('books', 'version', 'INTEGER NOT NULL DEFAULT 1')
+    _add_column_if_missing(
+        'books', 'updated_at', 'DATETIME',
+        backfill="UPDATE books SET updated_at = created_at WHERE updated_at IS NULL",
+    )
+    _add_column_if_missing('books', 'duplicate_of', 'INTEGER REFERENCES books(id)')
+    _create_missing_indexes()
+    ensure_catalog_state()
+    ensure_fts_index()
+
+
+if __name__ == '__main__':
+    from backend.app import create_app
+
+    app = create_app()
+    with app.app_context():
+        run_migrations()
+        print('Database migrated')
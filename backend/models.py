@@ -19,20 +19,46 @@ class User(db.Model):
 
 class Book(db.Model):
     __tablename__ = 'books'
+    __table_args__ = (
+        # Sort/keyset key of every list page
+        db.Index('ix_books_created_at_id', 'created_at', 'id'),
+        # Books written since a point in time: incremental exports, vector index catch-up
+        db.Index('ix_books_updated_at', 'updated_at'),
+        # Duplicate checks on import
+        db.Index('ix_books_title_author', 'title', 'author'),
+        # Case-insensitive metadata filters of semantic search
+        db.Index('ix_books_genre_nocase', db.text('genre COLLATE NOCASE')),
+        db.Index('ix_books_author_nocase', db.text('author COLLATE NOCASE')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     author = db.Column(db.String(200), nullable=False)
     genre = db.Column(db.String(100), nullable=True)
     description = db.Column(db.Text, nullable=True)
-    content = db.Column(db.Text, nullable=True)
+    # Full book text can be megabytes; only loaded when explicitly undeferred or accessed
+    content = db.deferred(db.Column(db.Text, nullable=True))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Bumped by every write to the book; drives its ETag / Last-Modified
+    version = db.Column(db.Integer, default=1, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+    # Set when the book was ingested as a near-duplicate of another one (DEDUP_POLICY=flag)
+    duplicate_of = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=True, index=True)
 
     bookings = db.relationship('Booking', back_populates='book', cascade='all, delete-orphan')
+    embedding = db.relationship('BookEmbedding', back_populates='book', uselist=False, cascade='all, delete-orphan')
+    summaries = db.relationship('BookSummary', back_populates='book', cascade='all, delete-orphan', lazy='dynamic')
+    minhash = db.relationship('BookMinHash', uselist=False, cascade='all, delete-orphan')
+    lsh_buckets = db.relationship('BookLshBucket', cascade='all, delete-orphan')
 
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        # Active-loan lookups: "end_date IS NULL OR end_date > now" per book / per user
+        db.Index('ix_bookings_book_id_end_date', 'book_id', 'end_date'),
+        db.Index('ix_bookings_user_id_end_date', 'user_id', 'end_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -44,3 +70,82 @@ class Booking(db.Model):
     book = db.relationship('Book', back_populates='bookings')
 
 
+class BookEmbedding(db.Model):
+    __tablename__ = 'book_embeddings'
+    __table_args__ = (
+        # Covers vector index catch-ups: rows of a model written since a point in time, and
+        # the row count, without reading the vector blobs
+        db.Index('ix_book_embeddings_model_updated_at', 'model_name', 'updated_at'),
+    )
+
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    # sha256 of the exact text that was encoded; a mismatch means the vector is stale
+    text_hash = db.Column(db.String(64), nullable=False)
+    model_name = db.Column(db.String(200), nullable=False)
+    dim = db.Column(db.Integer, nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    book = db.relationship('Book', back_populates='embedding')
+
+
+class BookSummary(db.Model):
+    __tablename__ = 'book_summaries'
+    __table_args__ = (
+        db.UniqueConstraint(
+            'book_id', 'content_hash', 'max_length', 'min_length', 'model_name', 'strategy',
+            name='uq_book_summaries_key',
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=False)
+    # sha256 of the summarized content; rows for an older hash are never served
+    content_hash = db.Column(db.String(64), nullable=False)
+    max_length = db.Column(db.Integer, nullable=False)
+    min_length = db.Column(db.Integer, nullable=False)
+    model_name = db.Column(db.String(200), nullable=False)
+    # How the content was fed to the model, e.g. "truncate" or "map-reduce:16"
+    strategy = db.Column(db.String(50), nullable=False, default='truncate')
+    summary = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    book = db.relationship('Book', back_populates='summaries')
+
+
+class BookNeighbor(db.Model):
+    """One entry of a book's precomputed nearest-neighbour list."""
+    __tablename__ = 'book_neighbors'
+
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    # Indexed so every list containing a book can be found when it changes
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+
+class BookMinHash(db.Model):
+    """MinHash signature of a book's normalized title/author/description shingles."""
+    __tablename__ = 'book_minhashes'
+
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)
+    # dedup.SIGNATURE_VERSION the signature was computed with
+    version = db.Column(db.Integer, default=1, nullable=False)
+
+
+class BookLshBucket(db.Model):
+    """One LSH band bucket of a book's signature; books sharing a bucket are duplicate candidates."""
+    __tablename__ = 'book_lsh_buckets'
+
+    # Hash of (band number, band values); the primary key index serves candidate lookups
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True, index=True)
+
+
+class CatalogState(db.Model):
+    """Single-row table holding a counter bumped by every catalog write."""
+    __tablename__ = 'catalog_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=1, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,138 @@
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request
+
+from backend.models import db, Book, Booking, User
+from backend.routes.parsing import parse_datetime
+
+
+bookings_bp = Blueprint('bookings', __name__)
+
+
+def serialize_booking(booking: Booking, book: Book = None):
+    data = {
+        "id": booking.id,
+        "user_id": booking.user_id,
+        "book_id": booking.book_id,
+        "start_date": booking.start_date.isoformat() if booking.start_date else None,
+        "end_date": booking.end_date.isoformat() if booking.end_date else None,
+    }
+    if book is not None:
+        data["book"] = {"title": book.title, "author": book.author}
+    return data
+
+
+def _active(now: datetime):
+    """Filter for loans still running at ``now``: open-ended or due in the future."""
+    return db.or_(Booking.end_date.is_(None), Booking.end_date > now)
+
+
+@bookings_bp.post('/')
+def checkout():
+    """Check a book out to a user; ``end_date`` (ISO 8601) is optional for open-ended loans.
+
+    The availability check and the insert are a single conditional
+    ``INSERT ... SELECT ... WHERE NOT EXISTS`` statement. On its own that is
+    only race-free because SQLite runs one writer at a time; on engines with
+    concurrent writers the book row is locked first (``SELECT ... FOR
+    UPDATE``, which SQLite omits), so two checkouts of the same book still
+    cannot both succeed. A unique index cannot enforce this, since whether a
+    loan with an ``end_date`` is active depends on the clock.
+    """
+    data = request.get_json(force=True)
+    user_id, book_id = data.get('user_id'), data.get('book_id')
+    if not isinstance(user_id, int) or not isinstance(book_id, int):
+        return jsonify({"error": "'user_id' and 'book_id' are required integers"}), 400
+    now = datetime.utcnow()
+    end_date = None
+    if data.get('end_date'):
+        try:
+            end_date = parse_datetime(data['end_date'])
+        except ValueError:
+            return jsonify({"error": "'end_date' must be an ISO 8601 date or datetime"}), 400
+        if end_date <= now:
+            return jsonify({"error": "'end_date' must be in the future"}), 400
+
+    if db.session.get(User, user_id) is None:
+        return jsonify({"error": "User not found"}), 404
+    # Serializes checkouts of this book until the commit below
+    if db.session.query(Book.id).filter(Book.id == book_id).with_for_update().first() is None:
+        return jsonify({"error": "Book not found"}), 404
+
+    on_loan = db.select(Booking.id).where(Booking.book_id == book_id, _active(now)).exists()
+    row = db.select(
+        db.literal(user_id), db.literal(book_id), db.literal(now), db.literal(end_date, db.DateTime),
+    ).where(~on_loan)
+    # RETURNING rather than lastrowid, which INSERT ... SELECT does not set on every driver
+    booking_id = db.session.execute(
+        db.insert(Booking).from_select(['user_id', 'book_id', 'start_date', 'end_date'], row).returning(Booking.id)
+    ).scalar_one_or_none()
+    db.session.commit()
+    if booking_id is None:
+        return jsonify({"error": "Book is already checked out"}), 409
+    return jsonify(serialize_booking(db.session.get(Booking, booking_id))), 201
+
+
+@bookings_bp.post('/<int:booking_id>/return')
+def return_booking(booking_id: int):
+    now = datetime.utcnow()
+    # Conditional update: only an active loan can be returned, and only once
+    result = db.session.execute(
+        db.update(Booking).where(Booking.id == booking_id, _active(now)).values(end_date=now)
+    )
+    db.session.commit()
+    if result.rowcount != 1:
+        if db.session.get(Booking, booking_id) is None:
+            return jsonify({"error": "Booking not found"}), 404
+        return jsonify({"error": "Booking is already returned"}), 409
+    return jsonify(serialize_booking(db.session.get(Booking, booking_id)))
+
+
+@bookings_bp.get('/users/<int:user_id>/active')
+def active_loans(user_id: int):
+    """A user's running loans with each book's title and author, in one query."""
+    if db.session.get(User, user_id) is None:
+        return jsonify({"error": "User not found"}), 404
+    rows = (
+        db.session.query(Booking, Book)
+        .join(Book, Book.id == Booking.book_id)
+        .filter(Booking.user_id == user_id, _active(datetime.utcnow()))
+        .order_by(Booking.start_date.desc())
+        .all()
+    )
+    return jsonify({"user_id": user_id, "bookings": [serialize_booking(b, book) for b, book in rows]})
+
+
+@bookings_bp.get('/availability')
+def availability():
+    """Availability of many books at once: ``?book_ids=1,2,3``.
+
+    One query joins the books to their active loans, so a list page can show
+    status without a request or query per book. Unknown ids are left out.
+    """
+    try:
+        book_ids = [int(i) for i in request.args.get('book_ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({"error": "'book_ids' must be a comma-separated list of integers"}), 400
+    limit = current_app.config['AVAILABILITY_MAX_IDS']
+    if len(book_ids) > limit:
+        return jsonify({"error": f"At most {limit} book ids per request"}), 400
+    if not book_ids:
+        return jsonify({"availability": []})
+
+    now = datetime.utcnow()
+    rows = (
+        db.session.query(Book.id, Booking.id.label('booking_id'), Booking.end_date)
+        .outerjoin(Booking, db.and_(Booking.book_id == Book.id, _active(now)))
+        .filter(Book.id.in_(book_ids))
+        .all()
+    )
+    loans = {row.id: row for row in rows}
+    return jsonify({"availability": [
+        {
+            "book_id": book_id,
+            "available": loans[book_id].booking_id is None,
+            "due": loans[book_id].end_date.isoformat() if loans[book_id].end_date else None,
+        }
+        for book_id in dict.fromkeys(book_ids) if book_id in loans
+    ]})
@@ -1,76 +1,413 @@
-from flask import Blueprint, jsonify, request
+import base64
+import json
+import logging
+import zlib
+from datetime import datetime
 
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+
+from backend.admission import admission
 from backend.models import db, Book
-from backend.ai_engine.summarizer import summarize_text
-from backend.ai_engine.recommender import top_k_similar
+from backend.catalog_version import book_stamp, bump_catalog_version, catalog_stamp, touch_book
+from backend.jobs import summary_jobs
+from backend.routes.parsing import parse_datetime
+from backend.bulk_import import ImportStats, import_books, iter_ndjson_rows
+from backend.dedup import (
+    DEDUP_POLICIES,
+    book_signature,
+    find_near_duplicates,
+    index_signatures,
+    merge_duplicates,
+    refresh_signature,
+)
+from backend.fts import build_match_expression, fts_available, fts_match_subquery
+from backend.ai_engine.summarizer import summarize_text, summary_profile, summary_strategy, summary_tiers
+from backend.ai_engine.summary_cache import (
+    content_hash,
+    get_cached_summary,
+    purge_stale_summaries,
+    store_summary,
+)
+from backend.ai_engine.query_cache import search_results
+from backend.ai_engine.recommender import encode_query, query_key
+from backend.ai_engine.neighbors import drop_neighbor_rows, stored_neighbors, update_neighbors
+from backend.ai_engine.embedding_store import (
+    get_book_vector,
+    get_vector_index,
+    index_book,
+    refresh_book_embedding,
+    unindex_book,
+)
 
 
 books_bp = Blueprint('books', __name__)
 
 
-def serialize_book(book: Book, include_content: bool = False):
-    return {
-        "id": book.id,
-        "title": book.title,
-        "author": book.author,
-        "genre": book.genre,
-        "description": book.description,
-        **({"content": book.content} if include_content else {}),
-        "created_at": book.created_at.isoformat() if book.created_at else None,
-    }
+BOOK_FIELDS = ('id', 'title', 'author', 'genre', 'description', 'content', 'created_at', 'duplicate_of')
+DEFAULT_LIST_FIELDS = tuple(f for f in BOOK_FIELDS if f != 'content')
+
+
+def serialize_book(book: Book, include_content: bool = False, fields=None):
+    if fields is None:
+        fields = BOOK_FIELDS if include_content else DEFAULT_LIST_FIELDS
+    data = {}
+    for field in fields:
+        value = getattr(book, field)
+        if field == 'created_at':
+            value = value.isoformat() if value else None
+        data[field] = value
+    return data
+
+
+def _load_book_or_404(book_id: int, with_content: bool = True) -> Book:
+    query = Book.query.filter_by(id=book_id)
+    if with_content:
+        query = query.options(db.undefer(Book.content))
+    return query.first_or_404()
+
+
+def _encode_cursor(values) -> str:
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+
+
+def _with_validators(response, etag: str, last_modified=None):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Clients may keep the body but must revalidate before reusing it
+    response.cache_control.no_cache = True
+    return response
+
+
+def _not_modified(etag: str, last_modified=None):
+    """A 304 response when the request's validators still match, else None."""
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    else:
+        return None
+    if not matched:
+        return None
+    return _with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def _ranked_payload(ranking):
+    """Serialize (book_id, score) pairs, preserving rank order."""
+    books = {b.id: b for b in Book.query.filter(Book.id.in_([book_id for book_id, _ in ranking])).all()}
+    results = []
+    for book_id, score in ranking:
+        b = books.get(book_id)
+        if b is None:
+            continue
+        payload = serialize_book(b)
+        payload["score"] = score
+        results.append(payload)
+    return results
 
 
 @books_bp.get('/')
 def list_books():
-    query = Book.query
+    """Page through the catalog newest first, or by relevance when ``q`` is given.
+
+    Pagination is keyset-based: ``next_cursor`` from one response is passed
+    back as ``?cursor=`` to continue after the last row without an OFFSET scan.
+    ``?fields=id,title`` restricts the columns loaded and returned.
+    """
+    version, modified = catalog_stamp()
+    etag = f"catalog-{version}"
+    not_modified = _not_modified(etag, modified)
+    if not_modified is not None:
+        return not_modified
+
+    try:
+        limit = int(request.args.get('limit', current_app.config['BOOKS_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer"}), 400
+    limit = max(1, min(limit, current_app.config['BOOKS_MAX_PAGE_SIZE']))
+
+    fields_param = request.args.get('fields')
+    if fields_param:
+        fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+        unknown = sorted(set(fields) - set(BOOK_FIELDS))
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+    else:
+        fields = list(DEFAULT_LIST_FIELDS)
+
+    cursor = None
+    if request.args.get('cursor'):
+        try:
+            cursor = _decode_cursor(request.args['cursor'])
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    # id and created_at are always loaded because the cursor is built from them
+    columns = {getattr(Book, f) for f in fields} | {Book.id, Book.created_at}
+    query = Book.query.options(db.load_only(*columns))
+    if 'content' in fields:
+        query = query.options(db.undefer(Book.content))
+
     search = request.args.get('q')
-    if search:
-        like = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                Book.title.ilike(like),
-                Book.author.ilike(like),
-                Book.genre.ilike(like),
-                Book.description.ilike(like),
-            )
-        )
-    books = query.order_by(Book.created_at.desc()).all()
-    return jsonify([serialize_book(b) for b in books])
+    match = build_match_expression(search) if search and fts_available() else None
+    try:
+        if match:
+            # Indexed full-text lookup; best bm25 hits first, keyed on (rank, id)
+            hits = fts_match_subquery(match)
+            query = query.add_columns(hits.c.rank).join(hits, Book.id == hits.c.book_id)
+            if cursor:
+                rank, last_id = float(cursor[0]), int(cursor[1])
+                query = query.filter(db.or_(
+                    hits.c.rank > rank,
+                    db.and_(hits.c.rank == rank, Book.id < last_id),
+                ))
+            rows = query.order_by(hits.c.rank, Book.id.desc()).limit(limit + 1).all()
+        else:
+            if search:
+                like = f"%{search}%"
+                query = query.filter(
+                    db.or_(
+                        Book.title.ilike(like),
+                        Book.author.ilike(like),
+                        Book.genre.ilike(like),
+                        Book.description.ilike(like),
+                    )
+                )
+            if cursor:
+                created_at, last_id = datetime.fromisoformat(cursor[0]), int(cursor[1])
+                query = query.filter(db.or_(
+                    Book.created_at < created_at,
+                    db.and_(Book.created_at == created_at, Book.id < last_id),
+                ))
+            rows = [(b, None) for b in query.order_by(Book.created_at.desc(), Book.id.desc()).limit(limit + 1).all()]
+    except (ValueError, TypeError, IndexError):
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, rank = rows[-1]
+        key = [rank, last.id] if match else [last.created_at.isoformat(), last.id]
+        next_cursor = _encode_cursor(key)
+    response = jsonify({
+        "books": [serialize_book(b, fields=fields) for b, _ in rows],
+        "next_cursor": next_cursor,
+    })
+    return _with_validators(response, etag, modified)
+
+
+def _iter_export_rows(include_content: bool, updated_since, chunk_size: int):
+    """Yield one NDJSON line per book, reading the table in id-ordered keyset chunks.
+
+    Each chunk is a fresh bounded query, so no cursor or transaction stays
+    open between chunks and only one chunk of rows is held at a time.
+    """
+    last_id = 0
+    while True:
+        query = Book.query.filter(Book.id > last_id)
+        if include_content:
+            query = query.options(db.undefer(Book.content))
+        if updated_since is not None:
+            query = query.filter(Book.updated_at > updated_since)
+        books = query.order_by(Book.id).limit(chunk_size).all()
+        if not books:
+            return
+        lines = []
+        for book in books:
+            data = serialize_book(book, include_content=include_content)
+            data['version'] = book.version
+            data['updated_at'] = book.updated_at.isoformat() if book.updated_at else None
+            lines.append(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        last_id = books[-1].id
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+        if len(books) < chunk_size:
+            return
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        # A sync flush per chunk sends each batch of rows out now instead of when zlib's buffer fills
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+@books_bp.get('/export')
+def export_books():
+    """Stream the catalog as NDJSON, one book per line, in id order.
+
+    ``?updated_since=`` (ISO 8601) limits the export to books changed after
+    that time and ``?include_content=1`` adds the full text. The body is
+    gzip-compressed on the fly when the client accepts it.
+    """
+    include_content = request.args.get('include_content', '0').lower() in ('1', 'true', 'yes')
+    updated_since = None
+    if request.args.get('updated_since'):
+        try:
+            updated_since = parse_datetime(request.args['updated_since'])
+        except ValueError:
+            return jsonify({"error": "'updated_since' must be an ISO 8601 date or datetime"}), 400
+    chunk_size = current_app.config['EXPORT_CHUNK_SIZE']
+
+    def generate():
+        try:
+            yield from _iter_export_rows(include_content, updated_since, chunk_size)
+        except Exception:
+            # Headers are already sent; the truncated body is all the client can see
+            logging.exception("Catalog export failed")
+            raise
+
+    body = stream_with_context(generate())
+    use_gzip = request.accept_encodings['gzip'] > 0
+    response = Response(_gzip_stream(body) if use_gzip else body, mimetype='application/x-ndjson')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
 
 
 @books_bp.get('/<int:book_id>')
 def get_book(book_id: int):
-    book = Book.query.get_or_404(book_id)
-    return jsonify(serialize_book(book, include_content=True))
+    stamp = book_stamp(book_id)
+    if stamp is not None:
+        etag = f"book-{book_id}-{stamp[0]}"
+        not_modified = _not_modified(etag, stamp[1])
+        if not_modified is not None:
+            return not_modified
+    book = _load_book_or_404(book_id)
+    response = jsonify(serialize_book(book, include_content=True))
+    return _with_validators(response, f"book-{book_id}-{book.version}", book.updated_at)
+
+
+def _index_write(book_ids, book: Book = None, refill=()) -> None:
+    """Mirror a committed write into the vector index and the stored neighbour lists.
+
+    Skipped when writes defer embedding (``EMBED_ON_WRITE`` off, the catalog
+    profile): the next search or recommendation encodes the books and
+    catches the index up, so a write never builds the index itself.
+    """
+    if not current_app.config['EMBED_ON_WRITE']:
+        return
+    if book is not None:
+        index_book(book)
+    update_neighbors(book_ids, refill)
+
+
+def _dedup_policy():
+    """``?on_duplicate=`` or ``DEDUP_POLICY``, and an error message when it is unknown."""
+    policy = request.args.get('on_duplicate') or current_app.config['DEDUP_POLICY']
+    if policy not in DEDUP_POLICIES:
+        return None, f"'on_duplicate' must be one of {', '.join(DEDUP_POLICIES)}"
+    return policy, None
+
+
+def _merge_duplicate(book_id: int, data: dict, similarity: float):
+    book = _load_book_or_404(book_id)
+    if merge_duplicates([(book, data)], encode=current_app.config['EMBED_ON_WRITE']):
+        db.session.commit()
+        _index_write([book.id], book)
+    payload = serialize_book(book, include_content=True)
+    payload.update({"merged": True, "similarity": similarity})
+    return jsonify(payload)
 
 
 @books_bp.post('/')
 def create_book():
+    """Create a book, checking it against the catalog for near-duplicates first.
+
+    Per ``?on_duplicate=`` (default ``DEDUP_POLICY``) a near-duplicate is
+    stored with ``duplicate_of`` set (flag), refused with 409 (reject) or
+    folded into the existing book, filling its empty fields (merge).
+    """
     data = request.get_json(force=True)
     title = data.get('title')
     author = data.get('author')
     if not title or not author:
         return jsonify({"error": "'title' and 'author' are required"}), 400
+    policy, error = _dedup_policy()
+    if error:
+        return jsonify({"error": error}), 400
+
+    signature = book_signature(title, author, data.get('description'))
+    match = None
+    if policy != 'off' and signature is not None:
+        match = find_near_duplicates([signature], current_app.config['DEDUP_THRESHOLD'])[0]
+    if match is not None and policy == 'reject':
+        return jsonify({
+            "error": "A near-duplicate of this book already exists",
+            "duplicate_of": match.book_id,
+            "similarity": match.similarity,
+        }), 409
+    if match is not None and policy == 'merge':
+        return _merge_duplicate(match.book_id, data, match.similarity)
+
     book = Book(
         title=title,
         author=author,
         genre=data.get('genre'),
         description=data.get('description'),
         content=data.get('content'),
+        duplicate_of=match.book_id if match is not None else None,
     )
     db.session.add(book)
+    refresh_book_embedding(book, encode=current_app.config['EMBED_ON_WRITE'])
+    db.session.flush()
+    if signature is not None:
+        index_signatures([(book.id, signature)])
+    bump_catalog_version()
     db.session.commit()
+    _index_write([book.id], book)
     return jsonify(serialize_book(book, include_content=True)), 201
 
 
+@books_bp.post('/bulk')
+def bulk_create_books():
+    """Import books from an NDJSON body, one JSON object per line.
+
+    The body is streamed and inserted in committed batches of ``?batch_size=``
+    rows; rows duplicating an existing (title, author) are skipped and
+    near-duplicates are handled per ``?on_duplicate=`` (default ``DEDUP_POLICY``).
+    """
+    try:
+        batch_size = int(request.args.get('batch_size', current_app.config['BULK_IMPORT_BATCH_SIZE']))
+    except ValueError:
+        return jsonify({"error": "'batch_size' must be an integer"}), 400
+    batch_size = max(1, min(batch_size, current_app.config['BULK_IMPORT_MAX_BATCH_SIZE']))
+    embed = request.args.get('embed', '1').lower() not in ('0', 'false', 'no')
+    policy, error = _dedup_policy()
+    if error:
+        return jsonify({"error": error}), 400
+    stats = ImportStats()
+    embed = embed and current_app.config['EMBED_ON_WRITE']
+    import_books(
+        iter_ndjson_rows(request.stream, stats), batch_size=batch_size, embed=embed, stats=stats,
+        dedup_policy=policy,
+    )
+    return jsonify(stats.to_dict()), 201 if stats.inserted else 200
+
+
 @books_bp.put('/<int:book_id>')
 def update_book(book_id: int):
-    book = Book.query.get_or_404(book_id)
+    book = _load_book_or_404(book_id)
     data = request.get_json(force=True)
     for field in ['title', 'author', 'genre', 'description', 'content']:
         if field in data:
             setattr(book, field, data[field])
+    if 'content' in data:
+        purge_stale_summaries(book)
+    if any(field in data for field in ('title', 'author', 'description')):
+        refresh_signature(book)
+    # Only re-encodes when the description/content hash actually changed
+    reencoded = refresh_book_embedding(book, encode=current_app.config['EMBED_ON_WRITE'])
+    touch_book(book)
     db.session.commit()
+    _index_write([book.id] if reencoded or book.embedding is None else [], book)
     return jsonify(serialize_book(book, include_content=True))
 
 
@@ -78,78 +415,246 @@ def update_book(book_id: int):
 def delete_book(book_id: int):
     book = Book.query.get_or_404(book_id)
     db.session.delete(book)
+    # Whatever the profile: a reused id must not inherit the book's list, nor others point at it
+    shortened = drop_neighbor_rows(book_id)
+    # Books flagged as its near-duplicates would otherwise point at a missing id
+    Book.query.filter(Book.duplicate_of == book_id).update(
+        {Book.duplicate_of: None, Book.version: Book.version + 1, Book.updated_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+    bump_catalog_version()
     db.session.commit()
+    unindex_book(book_id)
+    _index_write([book_id], refill=shortened)
     return jsonify({"status": "deleted", "id": book_id})
 
 
+def _summary_options(params: dict):
+    """Parse a summarize request body into generation options, or an error message."""
+    mode = params.get('mode', current_app.config['SUMMARY_MODE'])
+    if mode not in ('long', 'truncate'):
+        return None, "'mode' must be 'long' or 'truncate'"
+    long_document = mode == 'long'
+    max_chunks = int(params.get('max_chunks', current_app.config['SUMMARY_MAX_CHUNKS'])) or None
+    tier = params.get('tier') or current_app.config['SUMMARY_TIER']
+    try:
+        profile = summary_profile(tier)
+    except KeyError:
+        return None, f"'tier' must be one of {', '.join(summary_tiers())}"
+    # The tier caps the length; min_length can't exceed what is left
+    max_length = min(int(params.get('max_length', 130)), profile.max_length)
+    return {
+        "max_length": max_length,
+        "min_length": min(int(params.get('min_length', 30)), max_length),
+        "long_document": long_document,
+        "max_chunks": max_chunks,
+        "strategy": summary_strategy(long_document, max_chunks),
+        "tier": tier,
+        "model_name": profile.label,
+    }, None
+
+
+def _cached_summary(book_id: int, digest: str, options: dict):
+    return get_cached_summary(
+        book_id, digest, options['max_length'], options['min_length'], options['strategy'],
+        model_name=options['model_name'],
+    )
+
+
+def _generate_summary(book_id: int, source: str, digest: str, options: dict):
+    """Cached summary for the book's content, running the model on a miss."""
+    summary = _cached_summary(book_id, digest, options)
+    if summary:
+        return {"book_id": book_id, "summary": summary, "cached": True}
+
+    summary = summarize_text(
+        source,
+        max_length=options['max_length'],
+        min_length=options['min_length'],
+        long_document=options['long_document'],
+        max_chunks=options['max_chunks'],
+        batch_size=current_app.config['SUMMARY_BATCH_SIZE'],
+        tier=options['tier'],
+    )
+    if not summary:
+        return None
+    store_summary(
+        book_id, digest, options['max_length'], options['min_length'], options['strategy'], summary,
+        model_name=options['model_name'],
+    )
+    return {"book_id": book_id, "summary": summary, "cached": False}
+
+
+def _summarize_job(book_id: int, source: str, digest: str, options: dict):
+    cached = _cached_summary(book_id, digest, options)
+    if cached:
+        return {"book_id": book_id, "summary": cached, "cached": True}
+    # Model runs share the summarize slots with synchronous requests; a rejection fails the job
+    with admission.admit('summarize'):
+        result = _generate_summary(book_id, source, digest, options)
+    if result is None:
+        raise RuntimeError("Summarization failed")
+    return result
+
+
 @books_bp.post('/<int:book_id>/summarize')
 def summarize_book(book_id: int):
-    book = Book.query.get_or_404(book_id)
+    book = _load_book_or_404(book_id)
     source = (book.content or '').strip()
     if not source:
         return jsonify({"error": "No content available to summarize"}), 400
-    params = request.get_json(silent=True) or {}
-    max_length = int(params.get('max_length', 130))
-    min_length = int(params.get('min_length', 30))
-    summary = summarize_text(source, max_length=max_length, min_length=min_length)
-    if not summary:
+    options, error = _summary_options(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({"error": error}), 400
+
+    digest = content_hash(source)
+    cached = _cached_summary(book_id, digest, options)
+    if cached:
+        return jsonify({"book_id": book_id, "summary": cached, "cached": True})
+    # Only model runs take a slot; cache hits above never queue behind them
+    with admission.admit('summarize'):
+        result = _generate_summary(book_id, source, digest, options)
+    if result is None:
         return jsonify({"error": "Summarization failed"}), 500
+    return jsonify(result)
 
-    return jsonify({"book_id": book_id, "summary": summary})
 
+@books_bp.post('/<int:book_id>/summarize/jobs')
+def submit_summary_job(book_id: int):
+    """Queue a summary in the background worker pool and return its job id at once.
 
-@books_bp.get('/<int:book_id>/recommendations')
-def recommend_books(book_id: int):
-    book = Book.query.get_or_404(book_id)
-    target_text = (book.description or '') + '\n' + (book.content or '')
-    if not target_text.strip():
-        return jsonify({"error": "No text available for recommendations"}), 400
+    Identical requests (same book content and parameters) share one job.
+    """
+    book = _load_book_or_404(book_id)
+    source = (book.content or '').strip()
+    if not source:
+        return jsonify({"error": "No content available to summarize"}), 400
+    options, error = _summary_options(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({"error": error}), 400
 
-    other_books = Book.query.filter(Book.id != book_id).all()
-    corpus = [((b.description or '') + '\n' + (b.content or '')).strip() for b in other_books]
-    top_k = int(request.args.get('top_k', 5))
+    digest = content_hash(source)
+    key = (book_id, digest, options['max_length'], options['min_length'], options['strategy'], options['model_name'])
+    job, _ = summary_jobs.submit(key, _summarize_job, book_id, source, digest, options)
+    return jsonify({"book_id": book_id, **job.to_dict()}), 202
 
-    ranking = top_k_similar(target_text, corpus, top_k=top_k)
 
-    # Map indices back to book ids
-    results = []
-    for idx, score in ranking:
-        b = other_books[idx]
-        payload = serialize_book(b)
-        payload["score"] = score
-        results.append(payload)
+@books_bp.get('/summarize/jobs/<job_id>')
+def get_summary_job(job_id: str):
+    job = summary_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
 
-    return jsonify({"book_id": book_id, "recommendations": results})
+
+@books_bp.get('/<int:book_id>/recommendations')
+def recommend_books(book_id: int):
+    # Any catalog write can change a book's neighbours, so the catalog version is the validator
+    version, modified = catalog_stamp()
+    etag = f"recs-{book_id}-{version}"
+    not_modified = _not_modified(etag, modified)
+    if not_modified is not None:
+        return not_modified
+
+    max_top_k = current_app.config['RECOMMENDATION_NEIGHBORS']
+    try:
+        top_k = int(request.args.get('top_k', 5))
+    except ValueError:
+        return jsonify({"error": "'top_k' must be an integer"}), 400
+    if not 1 <= top_k <= max_top_k:
+        return jsonify({"error": f"'top_k' must be between 1 and {max_top_k}"}), 400
+
+    # Precomputed list: one indexed lookup joined to the neighbours' rows. Writes that defer
+    # embedding (EMBED_ON_WRITE off) leave the lists stale, so such workers rank live
+    stored = stored_neighbors(book_id, top_k) if current_app.config['EMBED_ON_WRITE'] else []
+    if stored:
+        recommendations = []
+        for neighbor, score in stored:
+            payload = serialize_book(neighbor)
+            payload["score"] = score
+            recommendations.append(payload)
+        response = jsonify({"book_id": book_id, "recommendations": recommendations})
+        return _with_validators(response, etag, modified)
+
+    book = _load_book_or_404(book_id, with_content=False)
+    with admission.admit('recommend'):
+        target_vec = get_book_vector(book)
+        if target_vec is None:
+            return jsonify({"error": "No text available for recommendations"}), 400
+        ranking = get_vector_index().search(target_vec, top_k=top_k, exclude_ids=[book_id])
+
+    response = jsonify({"book_id": book_id, "recommendations": _ranked_payload(ranking)})
+    return _with_validators(response, etag, modified)
+
+
+def _search_prefilter(data: dict):
+    """Turn the metadata filters of a search body into (candidate ids, excluded ids, error).
+
+    Candidate ids are ``None`` when no predicate was given, meaning the whole
+    catalog; otherwise they come from one indexed SQL query, so only those
+    books' vectors are scored.
+    """
+    exclude_ids = data.get('exclude_ids') or []
+    if not isinstance(exclude_ids, list) or not all(isinstance(i, int) for i in exclude_ids):
+        return None, None, "'exclude_ids' must be a list of book ids"
+
+    predicates = []
+    for field in ('genre', 'author'):
+        value = str(data.get(field) or '').strip()
+        if value:
+            predicates.append(getattr(Book, field).collate('NOCASE') == value)
+    if data.get('created_after'):
+        try:
+            after = parse_datetime(data['created_after'])
+        except ValueError:
+            return None, None, "'created_after' must be an ISO 8601 date or datetime"
+        predicates.append(Book.created_at > after)
+
+    if not predicates:
+        return None, exclude_ids, None
+    candidates = [row.id for row in db.session.query(Book.id).filter(*predicates)]
+    return candidates, exclude_ids, None
 
 
 @books_bp.post('/search-by-description')
 def search_by_description():
-    """Find the most relevant books based on user description using AI."""
+    """Find the most relevant books based on user description using AI.
+
+    Optional ``genre``, ``author`` (both case-insensitive), ``created_after``
+    and ``exclude_ids`` narrow the candidates before any vector is scored.
+    Rankings are cached per query, filters and catalog version, so a repeated
+    search costs no model call and no scoring until the catalog changes.
+    """
     data = request.get_json(force=True)
     user_description = data.get('description', '').strip()
     if not user_description:
         return jsonify({"error": "'description' is required"}), 400
 
     top_k = int(data.get('top_k', 5))
-    
-    all_books = Book.query.all()
-    if not all_books:
-        return jsonify({"results": []})
-
-    # Build corpus from all books
-    corpus = [((b.description or '') + '\n' + (b.content or '')).strip() for b in all_books]
-    
-    # Find most similar books
-    ranking = top_k_similar(user_description, corpus, top_k=top_k)
-
-    # Map indices back to book ids
-    results = []
-    for idx, score in ranking:
-        b = all_books[idx]
-        payload = serialize_book(b)
-        payload["score"] = score
-        results.append(payload)
+    # Admitted before the index is touched: loading or catching it up can be the costly part
+    with admission.admit('search'):
+        index = get_vector_index()
+        # Any book write bumps the catalog version and the index generation, retiring old entries
+        cache_key = (
+            query_key(user_description), top_k,
+            str(data.get('genre') or '').strip(), str(data.get('author') or '').strip(),
+            str(data.get('created_after') or ''), repr(data.get('exclude_ids') or []),
+            catalog_stamp()[0], index.generation,
+        )
+        ranking = search_results.get(cache_key)
+        if ranking is not None:
+            return jsonify({"query": user_description, "results": _ranked_payload(ranking)})
+
+        candidates, exclude_ids, error = _search_prefilter(data)
+        if error:
+            return jsonify({"error": error}), 400
 
-    return jsonify({"query": user_description, "results": results})
+        if not len(index) or candidates == []:
+            return jsonify({"query": user_description, "results": []})
 
+        # Only the query is encoded; book vectors live in the resident index
+        query_vec = encode_query(user_description)
+        ranking = index.search(query_vec, top_k=top_k, exclude_ids=exclude_ids, candidate_ids=candidates)
 
+    search_results.put(cache_key, tuple(ranking))
+    return jsonify({"query": user_description, "results": _ranked_payload(ranking)})
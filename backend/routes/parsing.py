@@ -0,0 +1,9 @@
+from datetime import datetime, timezone
+
+
+def parse_datetime(value) -> datetime:
+    """ISO 8601 date or datetime as a naive UTC datetime; raises ValueError."""
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
@@ -1,35 +1,26 @@
-import csv
+import argparse
+import logging
 import os
 
 from backend.app import create_app
-from backend.models import db, Book
+from backend.bulk_import import import_books, iter_csv_rows, log_progress
 
 
-def seed_books_from_csv(csv_path: str):
-    with open(csv_path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-    for row in rows:
-        # Skip if book with same title + author exists
-        exists = Book.query.filter_by(title=row['title'], author=row['author']).first()
-        if exists:
-            continue
-        book = Book(
-            title=row.get('title') or 'Untitled',
-            author=row.get('author') or 'Unknown',
-            genre=row.get('genre') or None,
-            description=row.get('description') or None,
-            content=row.get('content') or None,
-        )
-        db.session.add(book)
-    db.session.commit()
+def seed_books_from_csv(csv_path: str, batch_size: int = 500, embed: bool = True):
+    """Stream a CSV into the catalog, skipping books whose title + author already exist."""
+    return import_books(iter_csv_rows(csv_path), batch_size=batch_size, embed=embed, progress=log_progress)
 
 
 if __name__ == '__main__':
+    default_path = os.path.join(os.path.dirname(__file__), 'data', 'seed_books.csv')
+    parser = argparse.ArgumentParser(description='Populate the database from a CSV file')
+    parser.add_argument('csv_path', nargs='?', default=default_path)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--no-embed', action='store_true', help='skip embedding precompute (computed lazily later)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     app = create_app()
     with app.app_context():
-        data_path = os.path.join(os.path.dirname(__file__), 'data', 'seed_books.csv')
-        seed_books_from_csv(data_path)
-        print('Seeded database from', data_path)
-
-
+        stats = seed_books_from_csv(args.csv_path, batch_size=args.batch_size, embed=not args.no_embed)
+        print('Seeded database from', args.csv_path, stats.to_dict())
@@ -0,0 +1,55 @@
+import logging
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from backend.models import db
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def _is_in_memory(url) -> bool:
+    return url.database in (None, '', ':memory:')
+
+
+def configure_engine_options(app: Flask) -> None:
+    """Fit ``SQLALCHEMY_ENGINE_OPTIONS`` to the database URL; call before ``db.init_app``.
+
+    The busy timeout is a SQLite connect argument, and in-memory SQLite runs
+    on a single shared connection (``StaticPool``), which takes no pool sizing.
+    """
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    # A copy: Flask-SQLAlchemy adds SQLite arguments to it in place
+    options['connect_args'] = dict(options.get('connect_args') or {})
+    if url.get_backend_name() != 'sqlite':
+        options['connect_args'].pop('timeout', None)
+    elif _is_in_memory(url):
+        options.pop('pool_size', None)
+        options.pop('max_overflow', None)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def init_app(app: Flask) -> None:
+    """Apply ``SQLITE_PRAGMAS`` to every pooled SQLite connection as it is opened."""
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != 'sqlite':
+            return
+        pragmas = dict(app.config.get('SQLITE_PRAGMAS') or {})
+        if _is_in_memory(engine.url):
+            # In-memory databases have no journal file to switch to WAL
+            pragmas.pop('journal_mode', None)
+            pragmas.pop('mmap_size', None)
+        event.listen(engine, 'connect', _pragma_listener(pragmas))
+        logging.debug("SQLite pragmas: %s", pragmas)
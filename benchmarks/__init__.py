@@ -0,0 +1 @@
+# Reproducible benchmarks for the library API; see README "Benchmarks"
@@ -0,0 +1,113 @@
+"""Deterministic synthetic catalog generator.
+
+Usage:
+    python -m benchmarks.catalog --size 100k --out catalog.ndjson
+"""
+import argparse
+import json
+import random
+import sys
+from typing import Dict, Iterator, List
+
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+GENRES = [
+    "Science Fiction", "Fantasy", "Romance", "Mystery", "Thriller", "Historical Fiction",
+    "Horror", "Adventure", "Biography", "Philosophy", "Poetry", "Young Adult",
+]
+THEMES = [
+    "time travel", "dragons", "a lost kingdom", "forbidden love", "a murder in the manor",
+    "space colonies", "artificial minds", "the sea", "a family secret", "war and exile",
+    "a haunted house", "the desert", "revolution", "first contact", "a stolen painting",
+    "the countryside in England", "an ancient prophecy", "a detective's last case",
+]
+NOUNS = [
+    "captain", "village", "machine", "letter", "forest", "river", "empire", "garden",
+    "stranger", "crown", "ship", "storm", "library", "city", "mountain", "archive",
+]
+VERBS = [
+    "discovers", "remembers", "betrays", "escapes", "builds", "searches for", "defends",
+    "loses", "follows", "questions", "rescues", "abandons",
+]
+ADJECTIVES = [
+    "quiet", "ancient", "restless", "forgotten", "brilliant", "broken", "hidden",
+    "distant", "reluctant", "fierce", "gentle", "strange",
+]
+FIRST_NAMES = ["Ada", "Tom", "Mara", "Elias", "June", "Omar", "Lena", "Hugo", "Iris", "Ravi", "Nell", "Sam"]
+LAST_NAMES = ["Hart", "Okafor", "Lindqvist", "Moreau", "Tanaka", "Walsh", "Ibarra", "Novak", "Reyes", "Bell"]
+
+# Mean lengths in characters; individual books vary log-normally around these
+DESCRIPTION_CHARS = 300
+CONTENT_CHARS = 3000
+
+
+def _sentence_pool(rng: random.Random, size: int = 4000) -> List[str]:
+    pool = []
+    for _ in range(size):
+        pool.append(
+            f"The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(VERBS)} "
+            f"the {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} near {rng.choice(THEMES)}."
+        )
+    return pool
+
+
+def _text(rng: random.Random, pool: List[str], mean_chars: int, lead: str = "") -> str:
+    target = max(40, int(rng.lognormvariate(0, 0.5) * mean_chars))
+    parts = [lead] if lead else []
+    length = len(lead)
+    while length < target:
+        sentence = rng.choice(pool)
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(parts)
+
+
+def generate_books(
+    count: int,
+    seed: int = 42,
+    description_chars: int = DESCRIPTION_CHARS,
+    content_chars: int = CONTENT_CHARS,
+) -> Iterator[Dict[str, str]]:
+    """Yield ``count`` book dicts; the same seed always yields the same catalog."""
+    rng = random.Random(seed)
+    pool = _sentence_pool(rng)
+    for i in range(count):
+        genre = rng.choice(GENRES)
+        theme = rng.choice(THEMES)
+        yield {
+            "title": f"The {rng.choice(ADJECTIVES).capitalize()} {rng.choice(NOUNS).capitalize()} {i}",
+            "author": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "genre": genre,
+            "description": _text(rng, pool, description_chars, lead=f"A {genre.lower()} story about {theme}."),
+            "content": _text(rng, pool, content_chars),
+        }
+
+
+def parse_size(value: str) -> int:
+    value = value.lower()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic book catalog as NDJSON")
+    parser.add_argument("--size", default="1k", help="1k, 100k, 1m or an explicit count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--description-chars", type=int, default=DESCRIPTION_CHARS)
+    parser.add_argument("--content-chars", type=int, default=CONTENT_CHARS)
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for book in generate_books(parse_size(args.size), args.seed, args.description_chars, args.content_chars):
+            out.write(json.dumps(book) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Benchmark driver: exercises the API through the Flask test client.
+
+Usage:
+    python -m benchmarks.run --size 1k --stand-ins --concurrency 8 --requests 500 --out report.json
+
+The catalog database is generated once per (size, seed) and reused on later
+runs. Each scenario reports p50/p95/p99 latency, throughput and the process
+peak RSS after it ran, as JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.catalog import THEMES, generate_books, parse_size
+
+
+def _search_words() -> List[str]:
+    words = set()
+    for theme in THEMES:
+        words.update(w for w in theme.split() if len(w) > 3)
+    return sorted(words)
+
+
+SEARCH_WORDS = _search_words()
+
+
+def _list_books(client, rng, ctx):
+    return client.get("/api/books/?limit=50")
+
+
+def _get_book(client, rng, ctx):
+    return client.get(f"/api/books/{rng.choice(ctx['ids'])}")
+
+
+def _text_search(client, rng, ctx):
+    return client.get("/api/books/", query_string={"q": rng.choice(SEARCH_WORDS)[:5], "limit": 20})
+
+
+def _recommend(client, rng, ctx):
+    return client.get(f"/api/books/{rng.choice(ctx['ids'])}/recommendations?top_k=5")
+
+
+def _semantic_search(client, rng, ctx):
+    return client.post(
+        "/api/books/search-by-description",
+        json={"description": f"a story about {rng.choice(THEMES)}", "top_k": 5},
+    )
+
+
+def _summarize(client, rng, ctx):
+    return client.post(f"/api/books/{rng.choice(ctx['ids'])}/summarize", json={})
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "list_books": _list_books,
+    "get_book": _get_book,
+    "text_search": _text_search,
+    "recommend_books": _recommend,
+    "search_by_description": _semantic_search,
+    "summarize_book": _summarize,
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def run_scenario(app, name: str, ctx: Dict, requests: int, concurrency: int, seed: int) -> Dict:
+    fn = SCENARIOS[name]
+
+    def worker(worker_id: int, count: int):
+        client = app.test_client()
+        rng = random.Random(seed * 1000 + worker_id)
+        latencies, errors = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            response = fn(client, rng, ctx)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            if response.status_code >= 400:
+                errors += 1
+        return latencies, errors
+
+    shares = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(worker, range(concurrency), shares))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(ms for lat, _ in outcomes for ms in lat)
+    return {
+        "requests": len(latencies),
+        "errors": sum(err for _, err in outcomes),
+        "concurrency": concurrency,
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else None,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def build_app(db_path: str, size: int, seed: int, batch_size: int):
+    from backend.config import config
+
+    config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+    config.STARTUP_PROFILE = "lazy"
+
+    from backend.app import create_app
+    from backend.bulk_import import import_books
+    from backend.models import db, Book
+
+    app = create_app()
+    with app.app_context():
+        existing = db.session.query(db.func.count(Book.id)).scalar()
+        if existing < size:
+            rows = ((i, book) for i, book in enumerate(generate_books(size, seed), start=1))
+            rows = (pair for pair in rows if pair[0] > existing)
+            stats = import_books(rows, batch_size=batch_size)
+            print(f"Generated catalog: {stats.to_dict()}", file=sys.stderr)
+        ids = [row.id for row in db.session.query(Book.id).all()]
+    return app, ids
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the library API")
+    parser.add_argument("--size", default="1k", help="catalog size: 1k, 100k, 1m or a count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="SQLite file for the generated catalog (reused when present)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per scenario")
+    parser.add_argument("--batch-size", type=int, default=1000, help="import batch size when generating")
+    parser.add_argument("--stand-ins", action="store_true", help="use tiny offline models instead of real ones")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="simulated stand-in encode latency")
+    parser.add_argument("--summary-latency-ms", type=float, default=0.0, help="simulated stand-in summary latency")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    size = parse_size(args.size)
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f"library-bench-{size}-{args.seed}.db")
+    if args.stand_ins:
+        from benchmarks.stand_ins import install_stand_ins
+
+        install_stand_ins(args.embed_latency_ms, args.summary_latency_ms)
+
+    app, ids = build_app(db_path, size, args.seed, args.batch_size)
+    ctx = {"ids": ids}
+
+    results = {}
+    for name in names:
+        if args.warmup:
+            run_scenario(app, name, ctx, args.warmup, 1, args.seed)
+        results[name] = run_scenario(app, name, ctx, args.requests, args.concurrency, args.seed)
+        print(f"{name}: {results[name]['latency_ms']} {results[name]['throughput_rps']} req/s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "catalog_size": len(ids),
+            "seed": args.seed,
+            "db": db_path,
+            "stand_ins": args.stand_ins,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Tiny offline stand-ins for the sentence transformer and BART pipeline.
+
+They implement just the surface the ai_engine uses, so model-heavy endpoints
+can be benchmarked without downloading weights. Timings then measure the
+serving path (DB, index, batching, serialization), not real inference.
+"""
+import hashlib
+import re
+import time
+from typing import List, Sequence, Union
+
+import numpy as np
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Bag-of-words feature hashing in place of ``SentenceTransformer``."""
+
+    def __init__(self, dim: int = 384, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency = latency_ms / 1000.0
+
+    def encode(self, texts: Union[str, Sequence[str]], normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        out = np.zeros((len(items), self.dim), dtype=np.float32)
+        for row, text in enumerate(items):
+            for word in _WORD_RE.findall(text.lower()):
+                digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+                out[row, int.from_bytes(digest, "little") % self.dim] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out /= np.where(norms == 0, 1.0, norms)
+        return out[0] if single else out
+
+
+class WhitespaceTokenizer:
+    model_max_length = 1024
+
+    def __call__(self, text, add_special_tokens: bool = False, **kwargs):
+        if isinstance(text, str):
+            return {"input_ids": text.split()}
+        return {"input_ids": [t.split() for t in text]}
+
+    def decode(self, ids: List[str], **kwargs) -> str:
+        return " ".join(ids)
+
+
+class LeadSummarizer:
+    """Returns the first sentences of each input in place of the BART pipeline."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.tokenizer = WhitespaceTokenizer()
+        self.latency = latency_ms / 1000.0
+
+    def __call__(self, inputs, max_length: int = 130, min_length: int = 30, **kwargs):
+        items = [inputs] if isinstance(inputs, str) else list(inputs)
+        if self.latency:
+            time.sleep(self.latency * len(items))
+        return [{"summary_text": " ".join(text.split()[:max_length])} for text in items]
+
+
+def install_stand_ins(embed_latency_ms: float = 0.0, summary_latency_ms: float = 0.0) -> None:
+    """Make the ai_engine loaders return the stand-ins instead of downloading models."""
+    from backend.ai_engine.recommender import get_embedding_model
+    from backend.ai_engine.summarizer import get_bart_summarizer
+
+    get_embedding_model.install(HashingEmbedder(latency_ms=embed_latency_ms))
+    get_bart_summarizer.install(LeadSummarizer(latency_ms=summary_latency_ms))
@@ -0,0 +1,55 @@
+import numpy as np
+
+from backend.dedup import NUM_PERM, band_buckets, book_signature, minhash, similarity
+
+
+THRESHOLD = 0.8
+
+
+def _overlapping_sets(rng, shared: int, own: int):
+    common = [f"s:{rng.integers(1 << 62)}" for _ in range(shared)]
+    a = set(common + [f"a:{rng.integers(1 << 62)}" for _ in range(own)])
+    b = set(common + [f"b:{rng.integers(1 << 62)}" for _ in range(own)])
+    return a, b
+
+
+def test_disjoint_sets_are_not_similar():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        a, b = _overlapping_sets(rng, 0, 100)
+        assert similarity(minhash(a), minhash(b)) < 0.1
+
+
+def test_low_overlap_stays_well_below_threshold():
+    rng = np.random.default_rng(1)
+    # 20 shared of 200 distinct features: Jaccard 0.1
+    worst = max(similarity(*map(minhash, _overlapping_sets(rng, 20, 90))) for _ in range(200))
+    assert worst < 0.3
+
+
+def test_one_shared_feature_with_a_small_hash_does_not_dominate():
+    # crc32 of this shingle is 2551218; it used to win most permutations of both books
+    shared = 'd:distant captain near'
+    a = {shared} | {f"a:{i}" for i in range(60)}
+    b = {shared} | {f"b:{i}" for i in range(60)}
+    assert similarity(minhash(a), minhash(b)) < 0.1
+
+
+def test_estimate_tracks_jaccard():
+    rng = np.random.default_rng(2)
+    a, b = _overlapping_sets(rng, 100, 50)  # Jaccard 0.5
+    assert abs(similarity(minhash(a), minhash(b)) - 0.5) < 0.15
+
+
+def test_edition_variants_match():
+    description = "A young wizard discovers a hidden school and an ancient enemy who wants him dead."
+    first = book_signature("The Hidden School", "Jane Doe", description)
+    second = book_signature("The Hidden School (2nd Edition, Illustrated)", "Doe, Jane", description)
+    assert similarity(first, second) >= THRESHOLD
+    assert len(set(band_buckets(first)) & set(band_buckets(second))) > 0
+
+
+def test_signature_shape():
+    sig = book_signature("Title", "Author", None)
+    assert sig.shape == (NUM_PERM,) and sig.dtype == np.uint32
+    assert book_signature("", "", "") is None
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+LIST_FIELDS = "id,title,author,genre,description,created_at"
+
+
+class BackendClient:
+    """Shared HTTP client for the Streamlit UI.
+
+    Requests go through one pooled keep-alive ``requests.Session``. GET
+    responses are kept in a bounded LRU cache: within ``cache_ttl`` seconds
+    they are served without any request, afterwards they are revalidated with
+    ``If-None-Match`` so an unchanged resource costs a bodiless 304. The
+    client's own writes clear the cache.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 10, cache_size: int = 256, cache_ttl: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[Tuple, Tuple[float, Optional[str], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="ui-fetch")
+
+    # -- cache -----------------------------------------------------------
+
+    def _cache_get(self, key: Tuple):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key: Tuple, etag: Optional[str], data: Any) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, etag, data)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    # -- transport -------------------------------------------------------
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None, timeout: float = 60):
+        key = (path, tuple(sorted((params or {}).items())))
+        entry = self._cache_get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[2]
+
+        headers = {"If-None-Match": entry[1]} if entry is not None and entry[1] else {}
+        r = self.session.get(f"{self.base_url}{path}", params=params, headers=headers, timeout=timeout)
+        if r.status_code == 304 and entry is not None:
+            self._cache_put(key, entry[1], entry[2])
+            return entry[2]
+        r.raise_for_status()
+        data = r.json()
+        self._cache_put(key, r.headers.get("ETag"), data)
+        return data
+
+    def send_json(self, method: str, path: str, payload: Optional[dict] = None, timeout: float = 60, invalidate: bool = True):
+        r = self.session.request(method, f"{self.base_url}{path}", json=payload, timeout=timeout)
+        if invalidate:
+            self.invalidate()
+        r.raise_for_status()
+        return r.json()
+
+    # -- API -------------------------------------------------------------
+
+    def fetch_books(self, query: Optional[str] = None, cursor: Optional[str] = None, page_size: int = 50):
+        """One page of the book list: ``{books, next_cursor}``; pass ``next_cursor`` back for the next page."""
+        params = {"fields": LIST_FIELDS, "limit": page_size}
+        if query:
+            params["q"] = query
+        if cursor:
+            params["cursor"] = cursor
+        return self.get_json("/api/books/", params=params)
+
+    def get_book(self, book_id: int):
+        return self.get_json(f"/api/books/{book_id}")
+
+    def recommend_books(self, book_id: int, top_k: int = 5):
+        return self.get_json(f"/api/books/{book_id}/recommendations", params={"top_k": top_k}, timeout=120)
+
+    def create_book(self, payload: dict):
+        return self.send_json("POST", "/api/books/", payload)
+
+    def update_book(self, book_id: int, payload: dict):
+        return self.send_json("PUT", f"/api/books/{book_id}", payload)
+
+    def delete_book(self, book_id: int):
+        return self.send_json("DELETE", f"/api/books/{book_id}")
+
+    def search_by_description(self, description: str, top_k: int = 5, **filters):
+        """``filters``: optional ``genre``, ``author``, ``created_after`` and ``exclude_ids``."""
+        payload = {"description": description, "top_k": top_k}
+        payload.update({k: v for k, v in filters.items() if v})
+        return self.send_json(
+            "POST", "/api/books/search-by-description", payload, timeout=120, invalidate=False,
+        )
+
+    def availability(self, book_ids, chunk_size: int = 500) -> Dict[int, dict]:
+        """Loan status per book id, fetched in as few calls as the server limit allows."""
+        ids = list(book_ids)
+        status = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk = ",".join(str(i) for i in ids[start:start + chunk_size])
+            for item in self.get_json("/api/bookings/availability", params={"book_ids": chunk})["availability"]:
+                status[item["book_id"]] = item
+        return status
+
+    def submit_summary(self, book_id: int, payload: dict):
+        return self.send_json("POST", f"/api/books/{book_id}/summarize/jobs", payload, invalidate=False)
+
+    def summary_job(self, job_id: str):
+        r = self.session.get(f"{self.base_url}/api/books/summarize/jobs/{job_id}", timeout=30)
+        r.raise_for_status()
+        return r.json()
+
+    def fetch_page(
+        self,
+        query: Optional[str],
+        book_id: Optional[int],
+        include_recommendations: bool = False,
+        cursor: Optional[str] = None,
+    ):
+        """Fetch one page of the book list, a book's details and its recommendations concurrently.
+
+        Failures of the optional parts come back as ``None``; results also warm
+        the cache for the individual calls made while rendering.
+        """
+        books_future = self._executor.submit(self.fetch_books, query, cursor)
+        book_future = self._executor.submit(self.get_book, book_id) if book_id else None
+        recs_future = (
+            self._executor.submit(self.recommend_books, book_id)
+            if book_id and include_recommendations else None
+        )
+
+        def _optional(future):
+            if future is None:
+                return None
+            try:
+                return future.result()
+            except Exception:
+                return None
+
+        page = books_future.result()
+        return {
+            "books": page["books"],
+            "next_cursor": page.get("next_cursor"),
+            "book": _optional(book_future),
+            "recommendations": _optional(recs_future),
+        }